@@ -0,0 +1,49 @@
+'''Time `Md5Anim.parse` on a synthetic clip against the combinator frame parser.
+
+Run from the repository root with `python -m benchmarks.bench_md5anim`.
+'''
+import random
+import sys
+import time
+from md5model import md5anim
+
+
+def synthetic(numFrames: int, numJoints: int = 64, seed: int = 0) -> str:
+    '''Build an md5anim document with every joint fully animated'''
+    rng = random.Random(seed)
+    hierarchies = [
+        md5anim.Hierarchy(jointName=f'joint{i}', parentJointIndex=i - 1, flags=63, startIndex=i * 6, comment=' ( Tx Ty Tz Qx Qy Qz )')
+        for i in range(numJoints)]
+    bounds = [md5anim.Bound(min=(-10, -10, 0), max=(10, 10, 70)) for _ in range(numFrames)]
+    baseframe = md5anim.BaseFrame(parts=[
+        md5anim.BaseFramePart(position=(0, 0, 0), orientation=(0, 0, 0)) for _ in range(numJoints)])
+    frames = [
+        md5anim.Frame(index=f, parts=[
+            md5anim.FramePart(values=[round(rng.uniform(-1, 1), 10) for _ in range(6)])
+            for _ in range(numJoints)])
+        for f in range(numFrames)]
+    return md5anim.Md5Anim(
+        version=10, commandline='synthetic', numJoints=numJoints, frameRate=24,
+        numAnimatedComponents=numJoints * 6, hierarchies=hierarchies, bounds=bounds,
+        baseframe=baseframe, frames=frames).to_string
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    numFrames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    text = synthetic(numFrames)
+    (anim, elapsed) = timed(md5anim.Md5Anim.parse, text)
+    print(f'Md5Anim.parse            {numFrames} frames {elapsed:8.3f}s')
+    reference = md5anim.many1(
+        md5anim.keyValue('frame', md5anim.integer()) >>
+        md5anim.block(md5anim.sepBy1(md5anim.FramePartParser, md5anim.spaces1())))
+    body = text[text.index('\nframe ') + 1:]
+    small = body[:body.index('frame', len(body) // 10)]
+    (parts, elapsed) = timed(reference.parse, small)
+    print(f'combinator frame blocks  {len(parts)} frames {elapsed:8.3f}s')
+    assert [frame.parts for frame in anim.frames[:len(parts)]] == parts
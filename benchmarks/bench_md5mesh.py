@@ -0,0 +1,55 @@
+'''Time `Md5Mesh.parse` on a synthetic model against the combinator parser.
+
+Run from the repository root with `python -m benchmarks.bench_md5mesh`.
+'''
+import random
+import sys
+import time
+from md5model import md5mesh
+
+
+# Seconds allowed for `Md5Mesh.parse` of the default 50000 verts
+TARGET = 1.0
+
+
+def synthetic(numVerts: int, numJoints: int = 64, seed: int = 0) -> str:
+    '''Build an md5mesh document with `numVerts` verts, about 2 weights per vert'''
+    rng = random.Random(seed)
+    joints = [
+        md5mesh.Joint(
+            name=f'joint{i}', parentIndex=i - 1,
+            position=tuple(round(rng.uniform(-50, 50), 6) for _ in range(3)),
+            orientation=tuple(round(rng.uniform(-0.5, 0.5), 10) for _ in range(3)),
+            comment=f' joint{i - 1}' if i else ' ')
+        for i in range(numJoints)]
+    verts, weights = [], []
+    for i in range(numVerts):
+        count = rng.randint(1, 3)
+        verts.append(md5mesh.Vert(index=i, uv=(round(rng.random(), 6), round(rng.random(), 6)), weightStart=len(weights), weightCount=count))
+        for _ in range(count):
+            weights.append(md5mesh.Weight(
+                index=len(weights), jointIndex=rng.randrange(numJoints), bias=round(1 / count, 6),
+                position=tuple(round(rng.uniform(-10, 10), 6) for _ in range(3))))
+    tris = [md5mesh.Tri(index=i, verts=(rng.randrange(numVerts), rng.randrange(numVerts), rng.randrange(numVerts))) for i in range(numVerts * 2)]
+    mesh = md5mesh.Mesh(comment=' synthetic', shader='models/synthetic', verts=verts, tris=tris, weights=weights)
+    return md5mesh.Md5Mesh(version=10, commandline='synthetic', joints=joints, meshes=[mesh]).to_string
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    numVerts = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    # The target scales with the size of the model
+    target = TARGET * numVerts / 50000
+    text = synthetic(numVerts)
+    (fast, elapsed) = timed(md5mesh.Md5Mesh.parse, text)
+    print(f'Md5Mesh.parse        {numVerts} verts {elapsed:8.3f}s (target {target:.3f}s)')
+    small = synthetic(numVerts // 10)
+    (reference, referenceElapsed) = timed(md5mesh.Md5MeshParser.parse, small)
+    print(f'Md5MeshParser.parse  {numVerts // 10} verts {referenceElapsed:8.3f}s')
+    assert md5mesh.Md5Mesh.parse(small) == reference
+    print('Md5Mesh.parse is', 'within' if elapsed <= target else 'OVER', 'its target')
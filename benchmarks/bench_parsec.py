@@ -0,0 +1,40 @@
+'''Time `many1` over growing inputs to check that repetition scales linearly.
+
+Run from the repository root with `python -m benchmarks.bench_parsec`.
+'''
+import time
+from md5model import md5anim, md5mesh, parsec
+
+
+SIZES = [2000, 4000, 8000, 16000, 32000]
+
+
+def weights(n: int) -> str:
+    return ''.join(f'\tweight {i} 3 0.5 ( 1.25 -2.5 {i}.75 )\n' for i in range(n))
+
+
+def verts(n: int) -> str:
+    return ''.join(f'\tvert {i} ( 0.25 0.{i} ) {i} 1\n' for i in range(n))
+
+
+def frameValues(n: int) -> str:
+    return ' '.join(f'{i}.5' for i in range(n))
+
+
+def bench(name, parser, generator):
+    print(name)
+    previous = None
+    for n in SIZES:
+        text = generator(n)
+        start = time.perf_counter()
+        parser.parse(text)
+        elapsed = time.perf_counter() - start
+        ratio = '' if previous is None else f'  x{elapsed / previous:.2f}'
+        print(f'  {n:>6} elements {elapsed:8.3f}s  {elapsed / n * 1e6:6.2f}us/element{ratio}')
+        previous = elapsed
+
+
+if __name__ == '__main__':
+    bench('many1(WeightParser)', parsec.many1(md5mesh.WeightParser), weights)
+    bench('many1(VertParser)', parsec.many1(md5mesh.VertParser), verts)
+    bench('FramePartParser', md5anim.FramePartParser, frameValues)
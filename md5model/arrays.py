@@ -0,0 +1,326 @@
+import numpy as np
+from dataclasses import dataclass, field, replace
+from typing import Iterator, List, Optional, Tuple
+from .helpers import *
+from .md5anim import Md5Anim, Md5AnimHeader, Hierarchy, componentTable, Bound, BaseFrame, BaseFramePart, Frame, FramePart
+from .md5mesh import Md5Mesh, Md5MeshParser, Mesh, MeshParser, Vert, Tri, Weight, fastParseMd5Mesh, scanMesh
+
+
+def isSequential(indices) -> bool:
+    '''Whether `indices` are 0, 1, 2 and so on'''
+    return np.array_equal(indices, np.arange(len(indices)))
+
+
+@dataclass(frozen=True, eq=False)
+class MeshArrays:
+    '''Struct-of-arrays form of `Mesh`. Row `i` of the vert, tri and weight arrays
+    holds the element with index `i`.'''
+    comment: str
+    shader: str
+    uv: np.ndarray           # (numVerts, 2) float64
+    weightStart: np.ndarray  # (numVerts,) int32
+    weightCount: np.ndarray  # (numVerts,) int32
+    tris: np.ndarray         # (numTris, 3) int32
+    jointIndex: np.ndarray   # (numWeights,) int32
+    bias: np.ndarray         # (numWeights,) float64
+    position: np.ndarray     # (numWeights, 3) float64
+
+    @classmethod
+    def parse(cls, data: str):
+        result = fastParseMeshArrays(data) if isinstance(data, str) else None
+        return result[0] if result else cls.from_mesh(MeshParser.parse(data))
+
+    @classmethod
+    def from_mesh(cls, mesh: Mesh) -> 'MeshArrays':
+        '''Raises ValueError unless the verts, tris and weights are numbered from 0 in
+        order, as the rows of the arrays stand for their indices'''
+        for elements in [mesh.verts, mesh.tris, mesh.weights]:
+            if not isSequential([x.index for x in elements]):
+                raise ValueError(f'Indices of mesh {mesh.comment!r} are not sequential')
+        return cls(
+            comment=mesh.comment,
+            shader=mesh.shader,
+            uv=np.array([x.uv for x in mesh.verts], dtype=np.float64).reshape(-1, 2),
+            weightStart=np.array([x.weightStart for x in mesh.verts], dtype=np.int32),
+            weightCount=np.array([x.weightCount for x in mesh.verts], dtype=np.int32),
+            tris=np.array([x.verts for x in mesh.tris], dtype=np.int32).reshape(-1, 3),
+            jointIndex=np.array([x.jointIndex for x in mesh.weights], dtype=np.int32),
+            bias=np.array([x.bias for x in mesh.weights], dtype=np.float64),
+            position=np.array([x.position for x in mesh.weights], dtype=np.float64).reshape(-1, 3))
+
+    def to_mesh(self) -> Mesh:
+        verts = list(map(
+            Vert,
+            range(self.numVerts),
+            map(tuple, self.uv.tolist()),
+            self.weightStart.tolist(),
+            self.weightCount.tolist()))
+        tris = list(map(
+            Tri,
+            range(self.numTris),
+            map(tuple, self.tris.tolist())))
+        weights = list(map(
+            Weight,
+            range(self.numWeights),
+            self.jointIndex.tolist(),
+            self.bias.tolist(),
+            map(tuple, self.position.tolist())))
+        return Mesh(comment=self.comment, shader=self.shader, verts=verts, tris=tris, weights=weights)
+
+    @property
+    def numVerts(self) -> int:
+        return len(self.uv)
+
+    @property
+    def numTris(self) -> int:
+        return len(self.tris)
+
+    @property
+    def numWeights(self) -> int:
+        return len(self.bias)
+
+    @property
+    def weightEnd(self) -> np.ndarray:
+        return self.weightStart + self.weightCount
+
+    @property
+    def to_string(self) -> str:
+        return concatFn(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        '''Yield the text of `to_string` a line at a time'''
+        yield 'mesh {\n'
+        yield f'\t//{self.comment}\n'
+        yield f'\tshader "{self.shader}"\n\n'
+
+        uv = formatNumbers(self.uv)
+        yield f'\tnumverts {self.numVerts}'
+        yield from iterString(
+            (f'vert {i} ( {u} {v} ) {s} {c}' for (i, u, v, s, c) in zip(
+                range(self.numVerts), uv[0::2], uv[1::2], self.weightStart.tolist(), self.weightCount.tolist())),
+            start='\n\t', sep='\n\t', end='\n\n')
+
+        yield f'\tnumtris {self.numTris}'
+        yield from iterString(
+            (f'tri {i} {v1} {v2} {v3}' for (i, (v1, v2, v3)) in enumerate(self.tris.tolist())),
+            start='\n\t', sep='\n\t', end='\n\n')
+
+        bias = formatNumbers(self.bias)
+        position = formatNumbers(self.position)
+        yield f'\tnumweights {self.numWeights}'
+        yield from iterString(
+            (f'weight {i} {j} {b} ( {x} {y} {z} )' for (i, j, b, x, y, z) in zip(
+                range(self.numWeights), self.jointIndex.tolist(), bias, position[0::3], position[1::3], position[2::3])),
+            start='\n\t', sep='\n\t', end='\n')
+        yield '}\n'
+
+    def write(self, fileobj):
+        '''Write `to_string` to `fileobj` without building it in memory'''
+        fileobj.writelines(self.iter_chunks())
+
+
+def fastParseMeshArrays(data: str, index: int = 0):
+    '''Parse a mesh block straight into `MeshArrays`, returning `(mesh, index)` or None
+    if the text is not understood or its indices are not sequential. See `scanMesh`.'''
+    result = scanMesh(data, index)
+    if not result:
+        return None
+    (comment, shader, verts, tris, weights, index) = result
+    if not all(isSequential(np.array(x[0], dtype=np.int64)) for x in [verts, tris, weights]):
+        return None
+    (_, us, vs, weightStarts, weightCounts) = verts
+    (_, v1s, v2s, v3s) = tris
+    (_, jointIndices, biases, xs, ys, zs) = weights
+    mesh = MeshArrays(
+        comment=comment,
+        shader=shader,
+        uv=np.array([us, vs], dtype=np.float64).T.copy(),
+        weightStart=np.array(weightStarts, dtype=np.int32),
+        weightCount=np.array(weightCounts, dtype=np.int32),
+        tris=np.array([v1s, v2s, v3s], dtype=np.int32).T.copy(),
+        jointIndex=np.array(jointIndices, dtype=np.int32),
+        bias=np.array(biases, dtype=np.float64),
+        position=np.array([xs, ys, zs], dtype=np.float64).T.copy())
+    return (mesh, index)
+
+
+def toArrays(md5_mesh: Md5Mesh) -> Md5Mesh:
+    '''Convert every mesh of `md5_mesh` to `MeshArrays`'''
+    return replace(md5_mesh, meshes=[
+        x if isinstance(x, MeshArrays) else MeshArrays.from_mesh(x)
+        for x in md5_mesh.meshes])
+
+
+def toMeshes(md5_mesh: Md5Mesh) -> Md5Mesh:
+    '''Convert every mesh of `md5_mesh` back to `Mesh`'''
+    return replace(md5_mesh, meshes=[
+        x.to_mesh() if isinstance(x, MeshArrays) else x
+        for x in md5_mesh.meshes])
+
+
+def parseMd5Mesh(data) -> Md5Mesh:
+    '''Parse an md5mesh document, text or the UTF-8 bytes of one in `bytes`, a
+    `bytearray` or an `mmap`, into an `Md5Mesh` whose meshes are `MeshArrays`.
+    Raises ValueError for meshes that `MeshArrays.from_mesh` rejects.'''
+    md5_mesh = fastParseMd5Mesh(data, fastParseMeshArrays)
+    return md5_mesh or toArrays(Md5MeshParser.parse(toText(data)))
+
+
+def vertexValues(loopVerts: np.ndarray, loopValues: np.ndarray, numVerts: int) -> np.ndarray:
+    '''Per-vertex values (numVerts, ...) taken from the first loop that uses each
+    vertex, or zero for vertices no loop uses'''
+    (verts, first) = np.unique(loopVerts, return_index=True)
+    values = np.zeros((numVerts,) + loopValues.shape[1:], dtype=np.float64)
+    values[verts] = loopValues[first]
+    return values
+
+
+def baseframeArray(baseframe: BaseFrame, dtype=np.float64) -> np.ndarray:
+    '''Positions and orientations of `baseframe` as a (numParts, 6) array'''
+    return np.array([x.position + x.orientation for x in baseframe.parts], dtype=dtype).reshape(-1, 6)
+
+
+def boundsArray(bounds: List[Bound], dtype=np.float64) -> np.ndarray:
+    '''Minimums and maximums of `bounds` as a (numFrames, 2, 3) array'''
+    return np.array([(x.min, x.max) for x in bounds], dtype=dtype).reshape(-1, 2, 3)
+
+
+def frameLayout(frames: List[Frame]) -> Optional[Tuple[int, ...]]:
+    '''Number of values on each line of the frame blocks, or None if they differ'''
+    layouts = {tuple(len(x.values) for x in frame.parts) for frame in frames}
+    return layouts.pop() if len(layouts) == 1 else None
+
+
+@dataclass(frozen=True, eq=False)
+class AnimArrays:
+    '''Dense form of `Md5Anim`. Row `i` of `frames` holds the animated components of
+    frame `i`, and `partSizes` records how many of them go on each line of a frame
+    block (None for one line per animated joint).'''
+    version: int
+    commandline: str
+    numJoints: int
+    frameRate: int
+    hierarchies: List[Hierarchy]
+    frames: np.ndarray     # (numFrames, numAnimatedComponents)
+    baseframe: np.ndarray  # (numBaseFrameParts, 6): position then orientation
+    bounds: np.ndarray     # (numFrames, 2, 3): min then max
+    partSizes: Optional[Tuple[int, ...]] = None
+    components: np.ndarray = field(init=False, repr=False)  # (numJoints, 6) frame columns, -1 for baseframe
+
+    def __post_init__(self):
+        object.__setattr__(self, 'components', np.array(componentTable(self.hierarchies), dtype=np.intp).reshape(-1, 6))
+
+    @classmethod
+    def from_md5anim(cls, anim: Md5Anim, dtype=np.float64) -> 'AnimArrays':
+        values = [[v for part in frame.parts for v in part.values] for frame in anim.frames]
+        if len({len(x) for x in values}) > 1:
+            raise ValueError('Frames do not all have the same number of values')
+        numAnimatedComponents = len(values[0]) if values else anim.numAnimatedComponents
+        return cls(
+            version=anim.version,
+            commandline=anim.commandline,
+            numJoints=anim.numJoints,
+            frameRate=anim.frameRate,
+            hierarchies=anim.hierarchies,
+            frames=np.array(values, dtype=dtype).reshape(len(values), numAnimatedComponents),
+            baseframe=baseframeArray(anim.baseframe, dtype),
+            bounds=boundsArray(anim.bounds, dtype),
+            partSizes=frameLayout(anim.frames))
+
+    @classmethod
+    def read(cls, fileobj, dtype=np.float64) -> 'AnimArrays':
+        '''Read an md5anim text file, binary file or `mmap` with `Md5Anim.stream`,
+        filling the frame matrix one frame at a time'''
+        (header, stream) = Md5Anim.stream(fileobj)
+        frames = np.empty((header.numFrames, header.numAnimatedComponents), dtype=dtype)
+        layouts = set()
+        for (i, frame) in enumerate(stream):
+            # The stream raises ParseError at its end if there are extra frames
+            if i < header.numFrames:
+                frames[i] = [v for part in frame.parts for v in part.values]
+                layouts.add(tuple(len(x.values) for x in frame.parts))
+        return cls(
+            version=header.version,
+            commandline=header.commandline,
+            numJoints=header.numJoints,
+            frameRate=header.frameRate,
+            hierarchies=header.hierarchies,
+            frames=frames,
+            baseframe=baseframeArray(header.baseframe, dtype),
+            bounds=boundsArray(header.bounds, dtype),
+            partSizes=layouts.pop() if len(layouts) == 1 else None)
+
+    def to_md5anim(self) -> Md5Anim:
+        header = self.header
+        return Md5Anim(
+            version=header.version,
+            commandline=header.commandline,
+            numJoints=header.numJoints,
+            frameRate=header.frameRate,
+            numAnimatedComponents=header.numAnimatedComponents,
+            hierarchies=header.hierarchies,
+            bounds=header.bounds,
+            baseframe=header.baseframe,
+            frames=list(self.iter_frames()))
+
+    @property
+    def header(self) -> Md5AnimHeader:
+        return Md5AnimHeader(
+            version=self.version,
+            commandline=self.commandline,
+            numFrames=self.numFrames,
+            numJoints=self.numJoints,
+            frameRate=self.frameRate,
+            numAnimatedComponents=self.numAnimatedComponents,
+            hierarchies=self.hierarchies,
+            bounds=[Bound(min=tuple(x[0]), max=tuple(x[1])) for x in self.bounds.tolist()],
+            baseframe=BaseFrame(parts=[
+                BaseFramePart(position=tuple(x[:3]), orientation=tuple(x[3:])) for x in self.baseframe.tolist()]))
+
+    def iter_frames(self) -> Iterator[Frame]:
+        '''Yield the rows of `frames` as `Frame` blocks, one at a time'''
+        sizes = self.layout
+        ends = np.cumsum(sizes, dtype=np.intp).tolist()
+        starts = [end - size for (size, end) in zip(sizes, ends)]
+        for (i, values) in enumerate(self.frames.tolist()):
+            yield Frame(index=i, parts=[FramePart(values=values[start:end]) for (start, end) in zip(starts, ends)])
+
+    @property
+    def to_string(self) -> str:
+        return concatFn(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        '''Yield the md5anim text of this clip a section, line or frame at a time'''
+        return self.header.iter_chunks(self.iter_frames())
+
+    def write(self, fileobj):
+        '''Write `to_string` to `fileobj`, building one frame block at a time'''
+        fileobj.writelines(self.iter_chunks())
+
+    @property
+    def numFrames(self) -> int:
+        return self.frames.shape[0]
+
+    @property
+    def numAnimatedComponents(self) -> int:
+        return self.frames.shape[1]
+
+    @property
+    def layout(self) -> Tuple[int, ...]:
+        '''Number of values on each line of a frame block'''
+        if self.partSizes is not None:
+            return self.partSizes
+        return tuple(bin(x.flags).count('1') for x in self.hierarchies if x.flags)
+
+    def frameRange(self, start: int, stop: int) -> 'AnimArrays':
+        '''Frames `start` to `stop` as views of this clip's arrays'''
+        return replace(self, frames=self.frames[start:stop], bounds=self.bounds[start:stop])
+
+    def componentRange(self, start: int, stop: int) -> np.ndarray:
+        '''View of animated components `start` to `stop` of every frame'''
+        return self.frames[:, start:stop]
+
+    def jointComponents(self, jointIndex: int) -> np.ndarray:
+        '''View of the animated components of joint `jointIndex` in every frame'''
+        start = self.hierarchies[jointIndex].startIndex
+        return self.componentRange(start, start + int((self.components[jointIndex] >= 0).sum()))
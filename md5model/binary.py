@@ -0,0 +1,198 @@
+import mmap
+import numpy as np
+import struct
+from typing import List, Tuple, Union
+from .arrays import AnimArrays, MeshArrays, toArrays
+from .md5anim import Hierarchy, Md5Anim
+from .md5mesh import Joint, Md5Mesh
+
+
+MAGIC = b'MD5B'
+FORMAT_VERSION = 1
+MESH = 1
+ANIM = 2
+
+# A packed model is a header, a directory entry per array, then the arrays, each
+# little-endian and aligned so that they can be read in place. The first two arrays
+# are a UTF-8 string table and its offsets.
+HEADER = struct.Struct('<4sIII')  # magic, format version, kind, number of arrays
+ENTRY = struct.Struct('<4sI3QQ')  # dtype, number of dimensions, shape, byte offset
+ALIGNMENT = 8
+
+# Arrays stored for each mesh of an md5mesh, in order
+MESH_ARRAYS = ('uv', 'weightStart', 'weightCount', 'tris', 'jointIndex', 'bias', 'position')
+
+
+def stringTable(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    '''Pack `strings` into UTF-8 bytes and (numStrings + 1) offsets'''
+    encoded = [x.encode('utf-8') for x in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(x) for x in encoded], out=offsets[1:])
+    return (np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+
+def readStrings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    '''Unpack a string table built by `stringTable`'''
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[start:end].decode('utf-8') for (start, end) in zip(bounds, bounds[1:])]
+
+
+def littleEndian(array) -> np.ndarray:
+    '''`array` as a C-contiguous little-endian array'''
+    array = np.asarray(array)
+    return np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+
+
+def packArrays(kind: int, strings: List[str], arrays: List[np.ndarray]) -> bytes:
+    (data, offsets) = stringTable(strings)
+    arrays = [littleEndian(x) for x in [data, offsets] + list(arrays)]
+    position = HEADER.size + ENTRY.size * len(arrays)
+    entries = []
+    for array in arrays:
+        position += -position % ALIGNMENT
+        if array.ndim > 3:
+            raise ValueError('Arrays of more than 3 dimensions cannot be packed')
+        shape = tuple(array.shape) + (0,) * (3 - array.ndim)
+        entries.append(ENTRY.pack(array.dtype.str.encode('ascii'), array.ndim, *shape, position))
+        position += array.nbytes
+
+    chunks = [HEADER.pack(MAGIC, FORMAT_VERSION, kind, len(arrays))] + entries
+    position = HEADER.size + ENTRY.size * len(arrays)
+    for array in arrays:
+        padding = -position % ALIGNMENT
+        chunks.append(b'\0' * padding)
+        chunks.append(array.tobytes())
+        position += padding + array.nbytes
+    return b''.join(chunks)
+
+
+def unpackArrays(buffer) -> Tuple[int, List[str], List[np.ndarray]]:
+    '''Read the kind, strings and arrays of a packed model. The arrays are views of
+    `buffer`, not copies.'''
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError('Packed model is truncated')
+    (magic, version, kind, count) = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a packed md5 model')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported packed format version {version}')
+    if len(view) < HEADER.size + ENTRY.size * count:
+        raise ValueError('Packed model is truncated')
+    arrays = []
+    for i in range(count):
+        (dtype, ndim, *shape, offset) = ENTRY.unpack_from(view, HEADER.size + ENTRY.size * i)
+        shape = tuple(shape[:ndim])
+        dtype = np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+        size = int(np.prod(shape, dtype=np.int64))
+        if offset + size * dtype.itemsize > len(view):
+            raise ValueError('Packed model is truncated')
+        arrays.append(np.frombuffer(view, dtype=dtype, count=size, offset=offset).reshape(shape))
+    if len(arrays) < 2:
+        raise ValueError('Packed model has no string table')
+    return (kind, readStrings(arrays[0], arrays[1]), arrays[2:])
+
+
+def packMesh(md5_mesh: Md5Mesh) -> bytes:
+    md5_mesh = toArrays(md5_mesh)
+    joints = md5_mesh.joints
+    strings = [md5_mesh.commandline]
+    strings += [x.name for x in joints] + [x.comment for x in joints]
+    arrays = [
+        np.array([md5_mesh.version, len(joints), len(md5_mesh.meshes)], dtype='<i8'),
+        np.array([x.parentIndex for x in joints], dtype='<i4'),
+        np.array([x.position for x in joints], dtype='<f8').reshape(-1, 3),
+        np.array([x.orientation for x in joints], dtype='<f8').reshape(-1, 3)]
+    for mesh in md5_mesh.meshes:
+        strings += [mesh.comment, mesh.shader]
+        arrays += [getattr(mesh, x) for x in MESH_ARRAYS]
+    return packArrays(MESH, strings, arrays)
+
+
+def unpackMesh(strings: List[str], arrays: List[np.ndarray]) -> Md5Mesh:
+    ((version, numJoints, numMeshes), parents, positions, orientations) = (arrays[0].tolist(), *arrays[1:4])
+    names = strings[1:1 + numJoints]
+    comments = strings[1 + numJoints:1 + 2 * numJoints]
+    joints = [
+        Joint(name=name, parentIndex=parent, position=tuple(position), orientation=tuple(orientation), comment=comment)
+        for (name, parent, position, orientation, comment) in zip(
+            names, parents.tolist(), positions.tolist(), orientations.tolist(), comments)]
+    meshes = []
+    for i in range(numMeshes):
+        (comment, shader) = strings[1 + 2 * numJoints + 2 * i:3 + 2 * numJoints + 2 * i]
+        start = 4 + len(MESH_ARRAYS) * i
+        meshes.append(MeshArrays(comment, shader, *arrays[start:start + len(MESH_ARRAYS)]))
+    return Md5Mesh(version=version, commandline=strings[0], joints=joints, meshes=meshes)
+
+
+def packAnim(anim: AnimArrays) -> bytes:
+    hierarchies = anim.hierarchies
+    strings = [anim.commandline]
+    strings += [x.jointName for x in hierarchies] + [x.comment for x in hierarchies]
+    partSizes = anim.partSizes
+    arrays = [
+        np.array([anim.version, anim.numJoints, anim.frameRate, len(hierarchies), partSizes is not None], dtype='<i8'),
+        np.array([(x.parentJointIndex, x.flags, x.startIndex) for x in hierarchies], dtype='<i4').reshape(-1, 3),
+        anim.frames,
+        anim.baseframe,
+        anim.bounds,
+        np.array(partSizes or (), dtype='<i4')]
+    return packArrays(ANIM, strings, arrays)
+
+
+def unpackAnim(strings: List[str], arrays: List[np.ndarray]) -> AnimArrays:
+    ((version, numJoints, frameRate, numHierarchies, hasPartSizes), hierarchies, frames, baseframe, bounds, partSizes) = (
+        arrays[0].tolist(), *arrays[1:6])
+    names = strings[1:1 + numHierarchies]
+    comments = strings[1 + numHierarchies:1 + 2 * numHierarchies]
+    return AnimArrays(
+        version=version,
+        commandline=strings[0],
+        numJoints=numJoints,
+        frameRate=frameRate,
+        hierarchies=[
+            Hierarchy(jointName=name, parentJointIndex=parent, flags=flags, startIndex=startIndex, comment=comment)
+            for (name, (parent, flags, startIndex), comment) in zip(names, hierarchies.tolist(), comments)],
+        frames=frames,
+        baseframe=baseframe,
+        bounds=bounds,
+        partSizes=tuple(partSizes.tolist()) if hasPartSizes else None)
+
+
+def dumps(model: Union[Md5Mesh, Md5Anim, AnimArrays]) -> bytes:
+    '''Pack an md5mesh or md5anim model. Meshes are packed as `MeshArrays`, which
+    raises ValueError for meshes whose indices are not sequential. Any other model
+    unpacks to one that writes the same text.'''
+    if isinstance(model, Md5Mesh):
+        return packMesh(model)
+    if isinstance(model, Md5Anim):
+        model = AnimArrays.from_md5anim(model)
+    if isinstance(model, AnimArrays):
+        return packAnim(model)
+    raise TypeError(f'Cannot pack {type(model).__name__}')
+
+
+def loads(buffer) -> Union[Md5Mesh, AnimArrays]:
+    '''Unpack a model from `bytes`, a `memoryview` or an `mmap`. The arrays of the
+    result are read-only views of `buffer`.'''
+    (kind, strings, arrays) = unpackArrays(buffer)
+    if kind == MESH:
+        return unpackMesh(strings, arrays)
+    if kind == ANIM:
+        return unpackAnim(strings, arrays)
+    raise ValueError(f'Unknown packed model kind {kind}')
+
+
+def dump(model, fileobj):
+    '''Write a packed model to a binary file object'''
+    fileobj.write(dumps(model))
+
+
+def load(path: str) -> Union[Md5Mesh, AnimArrays]:
+    '''Memory-map a packed model file and unpack it without copying its arrays. The
+    arrays keep the mapping open and it is closed once none of them is referenced;
+    read the file and use `loads` to avoid holding a mapping.'''
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(buffer)
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from typing import Callable, Optional, Union
+from . import binary
+from .arrays import AnimArrays, parseMd5Mesh
+from .md5mesh import Md5Mesh
+
+
+# Bump whenever a parser change alters what is produced from the same text
+PARSER_VERSION = 1
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), 'md5model-cache')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+SUFFIX = '.md5b'
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def readAnim(data) -> AnimArrays:
+    '''`AnimArrays.read` of `bytes` or an `mmap`, from its start'''
+    if isinstance(data, mmap.mmap):
+        data.seek(0)
+        return AnimArrays.read(data)
+    return AnimArrays.read(io.BytesIO(data))
+
+
+class ParseCache:
+    '''Parsed models under `directory`, keyed by a hash of their source bytes and
+    using at most about `maxBytes` of disk. Entries are models packed by `binary`
+    followed by the SHA-256 digest of the packed bytes, checked before use. Reading
+    an entry marks it as recently used, and the least recently used entries are
+    removed once the cache grows past its limit.'''
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, maxBytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.maxBytes = maxBytes
+
+    def key(self, kind: str, data) -> str:
+        '''Hex digest of the source bytes, the kind of model and the format versions'''
+        h = hashlib.sha256(f'{kind} {PARSER_VERSION} {binary.FORMAT_VERSION}\n'.encode('ascii'))
+        h.update(data)
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Union[Md5Mesh, AnimArrays]]:
+        '''The model stored under `key`, or None when it is missing or fails
+        validation, in which case the entry is removed. The entry is read in one go
+        and its arrays are views of those bytes, so no file stays open or mapped.'''
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        payload = memoryview(data)[:-DIGEST_SIZE]
+        try:
+            if len(data) <= DIGEST_SIZE or hashlib.sha256(payload).digest() != data[-DIGEST_SIZE:]:
+                raise ValueError('Cache entry does not match its digest')
+            model = binary.loads(payload)
+        except ValueError:
+            self.remove(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return model
+
+    def put(self, key: str, model: Union[Md5Mesh, AnimArrays]):
+        '''Store `model` under `key`, then evict old entries if over the limit'''
+        os.makedirs(self.directory, exist_ok=True)
+        payload = binary.dumps(model)
+        (fd, temporary) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.write(hashlib.sha256(payload).digest())
+            os.replace(temporary, self.path(key))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.evict()
+
+    def remove(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        '''Remove least recently used entries until the cache fits in `maxBytes`'''
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def parse(self, kind: str, data, parser: Callable[..., Union[Md5Mesh, AnimArrays]]):
+        '''Cached model for `data`, or `parser(data)` stored for the next time'''
+        key = self.key(kind, data)
+        model = self.get(key)
+        if model is None:
+            model = parser(data)
+            try:
+                self.put(key, model)
+            except OSError:
+                # A cache that cannot be written to is only slower
+                pass
+        return model
+
+    def parseMd5Mesh(self, data) -> Md5Mesh:
+        '''`arrays.parseMd5Mesh` of UTF-8 `data` in `bytes` or an `mmap`, through the
+        cache'''
+        return self.parse('md5mesh', data, parseMd5Mesh)
+
+    def parseMd5Anim(self, data) -> AnimArrays:
+        '''`AnimArrays.read` of UTF-8 `data` in `bytes` or an `mmap`, through the
+        cache'''
+        return self.parse('md5anim', data, readAnim)
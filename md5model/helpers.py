@@ -1,7 +1,61 @@
-from typing import List
+import contextlib
+import functools
+import gc
+import mmap
+import os
+import re
+from typing import Iterable, Iterator, List
 from .parsec import *
 
 
+# Regex equivalents of `number()` and `integer()` for the fast parsers
+NUMBER = r'-?[0-9]+(?:\.[0-9]+)?'
+INTEGER = r'-?[0-9]+'
+
+
+@functools.lru_cache(maxsize=None)
+def bytesPattern(pattern):
+    '''The bytes twin of a compiled text regex'''
+    return re.compile(pattern.pattern.encode('ascii'), pattern.flags & ~re.UNICODE)
+
+
+def matching(pattern, data):
+    '''`pattern` as given to match text, or its bytes twin to match `bytes`, a
+    `bytearray` or an `mmap`'''
+    return pattern if isinstance(data, str) else bytesPattern(pattern)
+
+
+@contextlib.contextmanager
+def mappedFile(path: str):
+    '''Map the file at `path` read-only for the duration of the block, yielding b''
+    for an empty file, which cannot be mapped'''
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+@contextlib.contextmanager
+def pausedGc():
+    '''Suspend the cyclic garbage collector for the duration of the block. Building
+    hundreds of thousands of small objects otherwise sets off a collection every few
+    hundred of them, each of which walks everything built so far.'''
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def toText(token) -> str:
+    '''Decode a token matched in bytes as UTF-8, leaving text as it is'''
+    return token if isinstance(token, str) else bytes(token).decode('utf-8')
+
+
 def concatFn(x: List):
     '''Convert list to string'''
     return ''.join(x)
@@ -12,6 +66,18 @@ def mkString(x: List[str], start: str = '', sep: str = '', end: str = ''):
     return start + sep.join(x) + end
 
 
+def iterString(x: Iterable[str], start: str = '', sep: str = '', end: str = '') -> Iterator[str]:
+    '''Lazy `mkString`: yield `start`, the strings of `x` separated by `sep`, then `end`'''
+    yield start
+    first = True
+    for item in x:
+        if not first:
+            yield sep
+        yield item
+        first = False
+    yield end
+
+
 def formatNumber(number: float) -> str:
     rounded = round(number, 10)
     truncated = int(rounded)
@@ -21,6 +87,43 @@ def formatNumber(number: float) -> str:
         return str(f'{rounded:.10f}').rstrip('0')
 
 
+# Trailing zeros of space-terminated `%.10f` output, trimmed by `formatNumbers`
+TRAILING_ZEROS = re.compile(r'0+ ')
+
+# Past this magnitude `%.10f` can disagree with `formatNumber` on integer values
+FORMAT_LIMIT = 1e15
+
+
+def formatNumbers(numbers) -> List[str]:
+    '''Format a sequence (or flattened array) of numbers exactly as `formatNumber`
+    would, with one `%` and two regex passes over all of them at once'''
+    values = numbers.ravel().tolist() if hasattr(numbers, 'ravel') else list(numbers)
+    if not values:
+        return []
+    if max(values) >= FORMAT_LIMIT or min(values) <= -FORMAT_LIMIT:
+        return [formatNumber(x) for x in values]
+    text = ('%.10f ' * len(values)) % tuple(values)
+    if 'n' in text:
+        return [formatNumber(x) for x in values]
+    text = text.replace('-0.0000000000 ', '0.0000000000 ')
+    text = TRAILING_ZEROS.sub(' ', text).replace('. ', ' ')
+    return text.split(' ')[:-1]
+
+
+def toNumber(token: str):
+    '''Convert a number token, text or bytes, the same way `number()` does'''
+    return float(token) if ('.' if isinstance(token, str) else b'.') in token else int(token)
+
+
+def toNumbers(tokens: List[str]) -> List:
+    '''Convert a list of number tokens, text or bytes, the same way `number()` does'''
+    dot = '.' if not tokens or isinstance(tokens[0], str) else b'.'
+    # Tokens hold at most one '.', so as many of them as tokens means no integers
+    if dot[:0].join(tokens).count(dot) == len(tokens):
+        return list(map(float, tokens))
+    return [float(x) if dot in x else int(x) for x in tokens]
+
+
 def whitespace():
     '''Parse whitespace only'''
     return regex(r'\s*', re.MULTILINE)
@@ -1,9 +1,15 @@
-from dataclasses import dataclass
-from typing import Tuple, List
+import codecs
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Tuple, List
 from .parsec import *
 from .helpers import *
 
 
+# Flag bits of `Hierarchy.flags`, in the order their values appear in a frame
+COMPONENTS = ('Tx', 'Ty', 'Tz', 'Qx', 'Qy', 'Qz')
+
+
 @generate
 def HierarchyParser():
     jointName = yield spaces() >> quoted() << spaces1()
@@ -40,15 +46,43 @@ def FramePartParser():
     return FramePart(values=values)
 
 
+FRAME_BLOCK_PATTERN = re.compile(r'\s*\{([^}]*)\}\s*')
+FRAME_PART_PATTERN = re.compile(rf'({NUMBER}(?:\s{NUMBER})*)')
+
+
+def decodeFrameParts(body: str):
+    '''Decode the text between the braces of a frame block into its parts in bulk,
+    returning None if the text is not understood. As with `FramePartParser`, a part
+    is a run of numbers separated by single whitespace characters. A blank body is a
+    frame with no animated components.'''
+    pieces = FRAME_PART_PATTERN.split(body)
+    gaps = pieces[2:-1:2]
+    if not all(gaps) or ''.join(pieces[::2]).strip():
+        return None
+    return [FramePart(values=toNumbers(run.split())) for run in pieces[1::2]]
+
+
+def framePartsBlock():
+    '''Parse a block of frame values with `decodeFrameParts`'''
+    @Parser
+    def frame_parts_parser(text, index):
+        match = FRAME_BLOCK_PATTERN.match(text, index)
+        parts = decodeFrameParts(match.group(1)) if match else None
+        if parts is None:
+            return Value.failure(index, 'frame values')
+        return Value.success(match.end(), parts)
+    return frame_parts_parser
+
+
 @generate
 def FrameParser():
     index = yield keyValue('frame', integer())
-    parts = yield block(sepBy1(FramePartParser, spaces1()))
+    parts = yield framePartsBlock() ^ block(sepBy(FramePartParser, spaces1()))
     return Frame(index=index, parts=parts)
 
 
 @generate
-def Md5AnimParser():
+def Md5AnimHeaderParser():
     version = yield keyValue('MD5Version', integer()) << spaces1()
     commandline = yield keyValue('commandline', quoted()) << spaces1()
     numFrames = yield keyValue('numFrames', integer()) << spaces1()
@@ -58,9 +92,86 @@ def Md5AnimParser():
     hierarchies = yield keyValue('hierarchy', block(many1(HierarchyParser)))
     bounds = yield keyValue('bounds', block(many1(BoundParser)))
     baseframe = yield BaseFrameParser << spaces()
+    return Md5AnimHeader(version=version, commandline=commandline, numFrames=numFrames, numJoints=numJoints, frameRate=frameRate, numAnimatedComponents=numAnimatedComponents, hierarchies=hierarchies, bounds=bounds, baseframe=baseframe)
+
+
+@generate
+def Md5AnimParser():
+    header = yield Md5AnimHeaderParser
     frames = yield many1(FrameParser) << spaces()
-    assert len(frames) == numFrames
-    return Md5Anim(version=version, commandline=commandline, numJoints=numJoints, frameRate=frameRate, numAnimatedComponents=numAnimatedComponents, hierarchies=hierarchies, bounds=bounds, baseframe=baseframe, frames=frames)
+    if len(frames) != header.numFrames:
+        expected = f'numFrames {header.numFrames} frames, not {len(frames)}'
+        return Parser(lambda text, index: Value.failure(index, expected))
+    return Md5Anim(version=header.version, commandline=header.commandline, numJoints=header.numJoints, frameRate=header.frameRate, numAnimatedComponents=header.numAnimatedComponents, hierarchies=header.hierarchies, bounds=header.bounds, baseframe=header.baseframe, frames=frames)
+
+
+# Line on which the header's last block starts; indentation is allowed as in `Md5AnimParser`
+BASEFRAME_PATTERN = re.compile(r'^[ \t]*baseframe(?![^\s{])', re.MULTILINE)
+
+
+def textReader(fileobj, chunkSize: int):
+    '''Function reading the next chunk of text from `fileobj`, or '' at the end. Text
+    files are read as they are. Bytes, from a binary file or an `mmap`, are decoded
+    as UTF-8 one chunk at a time so the whole file is never decoded at once.'''
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read() -> str:
+        chunk = fileobj.read(chunkSize)
+        if isinstance(chunk, str):
+            return chunk
+        text = decoder.decode(chunk, final=not chunk)
+        # A chunk ending inside a multibyte character may decode to nothing
+        while chunk and not text:
+            chunk = fileobj.read(chunkSize)
+            text = decoder.decode(chunk, final=not chunk)
+        return text
+    return read
+
+
+def streamHeader(read):
+    '''Read and parse everything up to the end of the baseframe block, returning
+    `(header, rest)` where `rest` is the text read past the header. Each search
+    resumes where the last one stopped, so the header is scanned only once.'''
+    (buffer, index, found, end) = ('', 0, False, -1)
+    while end < 0:
+        chunk = read()
+        if not chunk:
+            break
+        buffer += chunk
+        if not found:
+            match = BASEFRAME_PATTERN.search(buffer, index)
+            if not match:
+                # Resume at the start of the last line, which may be incomplete
+                index = max(index, buffer.rfind('\n', index) + 1)
+                continue
+            (found, index) = (True, match.end())
+        end = buffer.find('}', index)
+        index = len(buffer)
+    end = end + 1 if end >= 0 else len(buffer)
+    return (Md5AnimHeaderParser.parse(buffer[:end]), buffer[end:])
+
+
+def streamFrames(read, rest: str, numFrames: int):
+    '''Parse frames one at a time from `rest` followed by the chunks from `read`'''
+    (buffer, start, count) = (rest, 0, 0)
+    while True:
+        end = buffer.find('}', start)
+        while end < 0:
+            chunk = read()
+            if not chunk:
+                break
+            (buffer, start) = (buffer[start:] + chunk, 0)
+            end = buffer.find('}')
+        text = buffer[start:end + 1] if end >= 0 else buffer[start:]
+        # Like `Md5AnimParser`, stop at the first thing that is not a frame
+        if not text.lstrip().startswith('frame'):
+            break
+        frame = FrameParser.parse(text.lstrip())
+        start = end + 1
+        count += 1
+        yield frame
+    if count != numFrames:
+        raise ParseError(f'numFrames {numFrames} frames, not {count}', buffer, start)
 
 
 @dataclass(frozen=True)
@@ -81,7 +192,24 @@ class Hierarchy:
 
     @property
     def expanded_flags(self) -> List[bool]:
-        return [True if x == '1' else False for x in str(bin(56))[2:].zfill(6)[::-1]]
+        return [bool(self.flags & (1 << i)) for i in range(len(COMPONENTS))]
+
+
+def componentTable(hierarchies: List[Hierarchy]) -> List[Tuple[int, ...]]:
+    '''For each joint, the frame column holding each of Tx, Ty, Tz, Qx, Qy and Qz, or
+    -1 where the baseframe value is used instead'''
+    table = []
+    for hierarchy in hierarchies:
+        column = hierarchy.startIndex
+        row = []
+        for i in range(len(COMPONENTS)):
+            if hierarchy.flags & (1 << i):
+                row.append(column)
+                column += 1
+            else:
+                row.append(-1)
+        table.append(tuple(row))
+    return table
 
 
 @dataclass(frozen=True)
@@ -95,8 +223,7 @@ class Bound:
 
     @property
     def to_string(self) -> str:
-        (minX, minY, minZ) = [formatNumber(c) for c in self.min]
-        (maxX, maxY, maxZ) = [formatNumber(c) for c in self.max]
+        (minX, minY, minZ, maxX, maxY, maxZ) = formatNumbers(tuple(self.min) + tuple(self.max))
         return f'( {minX} {minY} {minZ} ) ( {maxX} {maxY} {maxZ} )'
 
 
@@ -111,8 +238,7 @@ class BaseFramePart:
 
     @property
     def to_string(self) -> str:
-        (x, y, z) = [formatNumber(c) for c in self.position]
-        (qx, qy, qz) = [formatNumber(c) for c in self.orientation]
+        (x, y, z, qx, qy, qz) = formatNumbers(tuple(self.position) + tuple(self.orientation))
         return f'( {x} {y} {z} ) ( {qx} {qy} {qz} )'
 
 
@@ -140,7 +266,7 @@ class FramePart:
 
     @property
     def to_string(self) -> str:
-        return mkString([formatNumber(x) for x in self.values], sep=' ')
+        return mkString(formatNumbers(self.values), sep=' ')
 
 
 @dataclass(frozen=True)
@@ -154,46 +280,109 @@ class Frame:
 
     @property
     def to_string(self) -> str:
-        parts = [x.to_string for x in self.parts]
+        values = formatNumbers([v for x in self.parts for v in x.values])
+        parts = []
+        start = 0
+        for x in self.parts:
+            parts.append(mkString(values[start:start + len(x.values)], sep=' '))
+            start += len(x.values)
         return mkString(parts, start=f'frame {self.index} ' + '{\n\t', sep='\n\t', end='\n}\n')
 
 
 @dataclass(frozen=True)
-class Md5Anim:
+class Md5AnimHeader:
     version: int
     commandline: str
+    numFrames: int
     numJoints: int
     frameRate: int
     numAnimatedComponents: int
     hierarchies: List[Hierarchy]
     bounds: List[Bound]
-    baseframe: Frame
-    frames: List[Frame]
+    baseframe: BaseFrame
 
     @classmethod
     def parse(cls, data: str):
-        return Md5AnimParser.parse(data)
+        return Md5AnimHeaderParser.parse(data)
 
-    @property
-    def to_string(self) -> str:
-        version = f'MD5Version {self.version}\n'
-        commandline = f'commandline "{self.commandline}"\n\n'
+    def iter_chunks(self, frames: Iterable[Frame] = ()) -> Iterator[str]:
+        '''Yield the text of an md5anim file with this header, followed by `frames`,
+        which may be generated lazily. `numFrames` is written as given.'''
+        yield f'MD5Version {self.version}\n'
+        yield f'commandline "{self.commandline}"\n\n'
 
-        numFrames = f'numFrames {len(self.frames)}\n'
-        numJoints = f'numJoints {self.numJoints}\n'
-        frameRate = f'frameRate {self.frameRate}\n'
-        numAnimatedComponents = f'numAnimatedComponents {self.numAnimatedComponents}\n\n'
+        yield f'numFrames {self.numFrames}\n'
+        yield f'numJoints {self.numJoints}\n'
+        yield f'frameRate {self.frameRate}\n'
+        yield f'numAnimatedComponents {self.numAnimatedComponents}\n\n'
 
-        hierarchies = mkString(
-            [x.to_string for x in self.hierarchies],
+        yield from iterString(
+            (x.to_string for x in self.hierarchies),
             start='hierarchy {\n\t', sep='\n\t', end='\n}\n\n')
 
-        bounds = mkString(
-            [x.to_string for x in self.bounds],
+        yield from iterString(
+            (x.to_string for x in self.bounds),
             start='bounds {\n\t', sep='\n\t', end='\n}\n\n')
 
-        baseframe = f'{self.baseframe.to_string}\n'
+        yield f'{self.baseframe.to_string}\n'
+
+        yield from iterString((x.to_string for x in frames), sep='\n')
+
+    def write(self, fileobj, frames: Iterable[Frame] = ()):
+        '''Write this header and `frames` to `fileobj` one frame at a time'''
+        fileobj.writelines(self.iter_chunks(frames))
+
+
+@dataclass(frozen=True)
+class Md5Anim:
+    version: int
+    commandline: str
+    numJoints: int
+    frameRate: int
+    numAnimatedComponents: int
+    hierarchies: List[Hierarchy]
+    bounds: List[Bound]
+    baseframe: Frame
+    frames: List[Frame]
+    components: List[Tuple[int, ...]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'components', componentTable(self.hierarchies))
+
+    @classmethod
+    def parse(cls, data: str):
+        return Md5AnimParser.parse(data)
+
+    @classmethod
+    def stream(cls, fileobj, chunkSize: int = 1 << 16) -> Tuple[Md5AnimHeader, Iterator[Frame]]:
+        '''Parse the header of an md5anim file object up front, returning it along with
+        an iterator that reads and parses one frame at a time from the rest of it.
+        `fileobj` may be a text file, a binary file or an `mmap`.'''
+        read = textReader(fileobj, chunkSize)
+        (header, rest) = streamHeader(read)
+        return (header, streamFrames(read, rest, header.numFrames))
+
+    @property
+    def header(self) -> Md5AnimHeader:
+        return Md5AnimHeader(
+            version=self.version,
+            commandline=self.commandline,
+            numFrames=len(self.frames),
+            numJoints=self.numJoints,
+            frameRate=self.frameRate,
+            numAnimatedComponents=self.numAnimatedComponents,
+            hierarchies=self.hierarchies,
+            bounds=self.bounds,
+            baseframe=self.baseframe)
+
+    @property
+    def to_string(self) -> str:
+        return concatFn(self.iter_chunks())
 
-        frames = mkString([x.to_string for x in self.frames], sep='\n')
+    def iter_chunks(self) -> Iterator[str]:
+        '''Yield the text of `to_string` a section, line or frame at a time'''
+        return self.header.iter_chunks(self.frames)
 
-        return version + commandline + numFrames + numJoints + frameRate + numAnimatedComponents + hierarchies + bounds + baseframe + frames
+    def write(self, fileobj):
+        '''Write `to_string` to `fileobj` without building it in memory'''
+        fileobj.writelines(self.iter_chunks())
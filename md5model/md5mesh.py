@@ -1,6 +1,8 @@
 import math
+import mmap
+import re
 from dataclasses import dataclass
-from typing import Tuple, List
+from typing import Iterator, Tuple, List
 from .parsec import *
 from .helpers import *
 
@@ -69,6 +71,152 @@ def Md5MeshParser():
     return Md5Mesh(version=version, commandline=commandline, joints=joints, meshes=meshes)
 
 
+TRIPLE = rf'\(\s*({NUMBER})\s+({NUMBER})\s+({NUMBER})\s*\)'
+
+HEADER_PATTERN = re.compile(
+    rf'MD5Version\s+({INTEGER})\s+commandline\s+"([^\\"]+)"\s+'
+    rf'numJoints\s+({INTEGER})\s+numMeshes\s+({INTEGER})\s+joints\s+\{{\s*')
+JOINT_PATTERN = re.compile(
+    rf'\s*"([^\\"]+)"\s+({INTEGER})\s+'
+    rf'\(\s*({NUMBER})\s+({NUMBER})\s+({NUMBER})\s+\)\s*'
+    rf'\(\s*({NUMBER})\s+({NUMBER})\s+({NUMBER})\s+\)\s*'
+    rf'(?://([^\n]+))?')
+MESH_PATTERN = re.compile(
+    rf'mesh\s+\{{\s*//([^\n]+)(?![^\n])\s+shader\s+"([^\\"]+)"\s+numverts\s+({INTEGER})\s*')
+VERT_PATTERN = re.compile(
+    rf'\s*vert\s+({INTEGER})\s+\(\s*({NUMBER})\s+({NUMBER})\s*\)\s+({INTEGER})\s+({INTEGER})\s*')
+NUMTRIS_PATTERN = re.compile(rf'numtris\s+({INTEGER})\s*')
+TRI_PATTERN = re.compile(rf'\s*tri\s+({INTEGER})\s+({INTEGER})\s+({INTEGER})\s+({INTEGER})\s*')
+NUMWEIGHTS_PATTERN = re.compile(rf'numweights\s+({INTEGER})\s*')
+WEIGHT_PATTERN = re.compile(rf'\s*weight\s+({INTEGER})\s+({INTEGER})\s+({NUMBER})\s+{TRIPLE}\s*')
+CLOSE_PATTERN = re.compile(r'\s*\}\s*')
+
+
+def scanSection(data: str, index: int, terminator: str, element, count: str):
+    '''Match a run of exactly `count` occurrences of `element` from `index` up to the
+    next `terminator`, returning `(columns, index)` or None. A single `split` both
+    checks that nothing but elements lies in between and collects the groups, one
+    list per group. `data` may be text or bytes, as in `scanMesh`.'''
+    end = data.find(terminator if isinstance(data, str) else terminator.encode('ascii'), index)
+    if end < 0:
+        return None
+    element = matching(element, data)
+    width = element.groups + 1
+    parts = element.split(data[index:end])
+    if any(parts[::width]) or len(parts) // width != int(count) or len(parts) == 1:
+        return None
+    return ([parts[i::width] for i in range(1, width)], end)
+
+
+def scanMesh(data: str, index: int = 0):
+    '''Match a mesh block with compiled regexes, returning `(comment, shader, verts,
+    tris, weights, index)` or None if the text is not understood. The verts, tris
+    and weights are lists of token columns, one per field. Matches the grammar of
+    `MeshParser`.
+
+    `data` may also be `bytes`, a `bytearray` or an `mmap`, in which case the
+    comment and shader are decoded and the number tokens are left as bytes. Only
+    one section at a time is copied out of `data`.'''
+    match = matching(MESH_PATTERN, data).match(data, index)
+    if not match:
+        return None
+    (comment, shader, numverts) = match.groups()
+    (comment, shader) = (toText(comment), toText(shader))
+
+    verts = scanSection(data, match.end(), 'numtris', VERT_PATTERN, numverts)
+    if not verts:
+        return None
+
+    match = matching(NUMTRIS_PATTERN, data).match(data, verts[1])
+    tris = match and scanSection(data, match.end(), 'numweights', TRI_PATTERN, match.group(1))
+    if not tris:
+        return None
+
+    match = matching(NUMWEIGHTS_PATTERN, data).match(data, tris[1])
+    weights = match and scanSection(data, match.end(), '}', WEIGHT_PATTERN, match.group(1))
+    if not weights:
+        return None
+
+    match = matching(CLOSE_PATTERN, data).match(data, weights[1])
+    return (comment, shader, verts[0], tris[0], weights[0], match.end())
+
+
+def fastParseMesh(data: str, index: int = 0):
+    '''Parse a mesh block with compiled regexes, returning `(mesh, index)` or None if
+    the text is not understood'''
+    result = scanMesh(data, index)
+    if not result:
+        return None
+    (comment, shader, verts, tris, weights, index) = result
+
+    (indices, us, vs, weightStarts, weightCounts) = verts
+    verts = list(map(
+        Vert,
+        map(int, indices),
+        zip(toNumbers(us), toNumbers(vs)),
+        map(int, weightStarts),
+        map(int, weightCounts)))
+
+    (indices, v1s, v2s, v3s) = tris
+    tris = list(map(
+        Tri,
+        map(int, indices),
+        zip(map(int, v1s), map(int, v2s), map(int, v3s))))
+
+    (indices, jointIndices, biases, xs, ys, zs) = weights
+    weights = list(map(
+        Weight,
+        map(int, indices),
+        map(int, jointIndices),
+        toNumbers(biases),
+        zip(toNumbers(xs), toNumbers(ys), toNumbers(zs))))
+    return (Mesh(comment=comment, shader=shader, verts=verts, tris=tris, weights=weights), index)
+
+
+def fastParseMd5Mesh(data: str, parseMesh=fastParseMesh):
+    '''Parse an md5mesh document with compiled regexes, returning None if the text is
+    not understood so that the caller can fall back to `Md5MeshParser`. Each mesh
+    block is read with `parseMesh`, see `fastParseMesh`. `data` may be text, or
+    `bytes`, a `bytearray` or an `mmap` of UTF-8 text.'''
+    if not isinstance(data, (str, bytes, bytearray, mmap.mmap)):
+        return None
+    match = matching(HEADER_PATTERN, data).match(data)
+    if not match:
+        return None
+    (version, commandline, numJoints, numMeshes) = match.groups()
+    index = match.end()
+
+    joints = []
+    jointPattern = matching(JOINT_PATTERN, data)
+    match = jointPattern.match(data, index)
+    while match:
+        (name, parentIndex, x, y, z, qx, qy, qz, comment) = match.groups()
+        joints.append(Joint(
+            name=toText(name),
+            parentIndex=int(parentIndex),
+            position=(toNumber(x), toNumber(y), toNumber(z)),
+            orientation=(toNumber(qx), toNumber(qy), toNumber(qz)),
+            comment=toText(comment) if comment else ''))
+        index = match.end()
+        match = jointPattern.match(data, index)
+
+    match = matching(CLOSE_PATTERN, data).match(data, index)
+    if not match or not joints or len(joints) != int(numJoints):
+        return None
+    index = match.end()
+
+    meshes = []
+    with pausedGc():
+        result = parseMesh(data, index)
+        while result:
+            (mesh, index) = result
+            meshes.append(mesh)
+            result = parseMesh(data, index)
+    if not meshes or len(meshes) != int(numMeshes):
+        return None
+    return Md5Mesh(version=int(version), commandline=toText(commandline), joints=joints, meshes=meshes)
+
+
 @dataclass(frozen=True)
 class Joint:
     name: str
@@ -83,8 +231,7 @@ class Joint:
 
     @property
     def to_string(self) -> str:
-        (x, y, z) = [formatNumber(c) for c in self.position]
-        (qx, qy, qz) = [formatNumber(c) for c in self.orientation]
+        (x, y, z, qx, qy, qz) = formatNumbers(tuple(self.position) + tuple(self.orientation))
         return f'"{self.name}"\t{self.parentIndex} ( {x} {y} {z} ) ( {qx} {qy} {qz} )\t\t//{self.comment}'
 
 
@@ -101,7 +248,7 @@ class Vert:
 
     @property
     def to_string(self) -> str:
-        (u, v) = [formatNumber(c) for c in self.uv]
+        (u, v) = formatNumbers(self.uv)
         return f'vert {self.index} ( {u} {v} ) {self.weightStart} {self.weightCount}'
 
     @property
@@ -137,8 +284,8 @@ class Weight:
 
     @property
     def to_string(self) -> str:
-        (x, y, z) = [formatNumber(c) for c in self.position]
-        return f'weight {self.index} {self.jointIndex} {formatNumber(self.bias)} ( {x} {y} {z} )'
+        (b, x, y, z) = formatNumbers((self.bias,) + tuple(self.position))
+        return f'weight {self.index} {self.jointIndex} {b} ( {x} {y} {z} )'
 
 
 @dataclass(frozen=True)
@@ -151,29 +298,38 @@ class Mesh:
 
     @classmethod
     def parse(cls, data: str):
-        return MeshParser.parse(data)
+        result = fastParseMesh(data) if isinstance(data, str) else None
+        return result[0] if result else MeshParser.parse(data)
 
     @property
     def to_string(self) -> str:
-        comment = f'\t//{self.comment}\n'
-        shader = f'\tshader "{self.shader}"\n\n'
+        return concatFn(self.iter_chunks())
 
-        numverts = f'\tnumverts {len(self.verts)}'
-        verts = mkString(
-            [x.to_string for x in self.verts],
+    def iter_chunks(self) -> Iterator[str]:
+        '''Yield the text of `to_string` a line at a time'''
+        yield 'mesh {\n'
+        yield f'\t//{self.comment}\n'
+        yield f'\tshader "{self.shader}"\n\n'
+
+        yield f'\tnumverts {len(self.verts)}'
+        yield from iterString(
+            (x.to_string for x in self.verts),
             start='\n\t', sep='\n\t', end='\n\n')
 
-        numtris = f'\tnumtris {len(self.tris)}'
-        tris = mkString(
-            [x.to_string for x in self.tris],
+        yield f'\tnumtris {len(self.tris)}'
+        yield from iterString(
+            (x.to_string for x in self.tris),
             start='\n\t', sep='\n\t', end='\n\n')
 
-        numweights = f'\tnumweights {len(self.weights)}'
-        weights = mkString(
-            [x.to_string for x in self.weights],
+        yield f'\tnumweights {len(self.weights)}'
+        yield from iterString(
+            (x.to_string for x in self.weights),
             start='\n\t', sep='\n\t', end='\n')
+        yield '}\n'
 
-        return 'mesh {\n' + comment + shader + numverts + verts + numtris + tris + numweights + weights + '}\n'
+    def write(self, fileobj):
+        '''Write `to_string` to `fileobj` without building it in memory'''
+        fileobj.writelines(self.iter_chunks())
 
 
 @dataclass(frozen=True)
@@ -185,20 +341,29 @@ class Md5Mesh:
 
     @classmethod
     def parse(cls, data: str):
-        return Md5MeshParser.parse(data)
+        return fastParseMd5Mesh(data) or Md5MeshParser.parse(toText(data))
 
     @property
     def to_string(self) -> str:
-        version = f'MD5Version {self.version}\n'
-        commandline = f'commandline "{self.commandline}"\n\n'
+        return concatFn(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        '''Yield the text of `to_string` a section, joint or line at a time'''
+        yield f'MD5Version {self.version}\n'
+        yield f'commandline "{self.commandline}"\n\n'
 
-        numJoints = f'numJoints {len(self.joints)}\n'
-        numMeshes = f'numMeshes {len(self.meshes)}\n\n'
+        yield f'numJoints {len(self.joints)}\n'
+        yield f'numMeshes {len(self.meshes)}\n\n'
 
-        joints = mkString(
-            [x.to_string for x in self.joints],
+        yield from iterString(
+            (x.to_string for x in self.joints),
             start='joints {\n\t', sep='\n\t', end='\n}\n\n')
 
-        meshes = mkString([x.to_string for x in self.meshes], sep='\n')
+        for (i, mesh) in enumerate(self.meshes):
+            if i:
+                yield '\n'
+            yield from mesh.iter_chunks()
 
-        return version + commandline + numJoints + numMeshes + joints + meshes
+    def write(self, fileobj):
+        '''Write `to_string` to `fileobj` without building it in memory'''
+        fileobj.writelines(self.iter_chunks())
@@ -0,0 +1,195 @@
+import re
+import numpy as np
+from dataclasses import dataclass, replace
+from typing import Optional
+from .arrays import AnimArrays
+from .md5anim import COMPONENTS, Hierarchy, Md5Anim
+from .md5mesh import Md5Mesh
+from .pose import componentsToFrames, interpolateComponents, localComponents
+from .skinning import animationBounds
+from .transforms import expandQuaternions, normalizeQuaternions
+
+
+# Component list at the end of a hierarchy comment, like `origin ( Tx Ty Tz )`
+COMPONENT_COMMENT = re.compile(r'\(\s*(?:[TQ][xyz]\s*)*\)\s*$')
+
+
+def withFlags(hierarchy: Hierarchy, flags: int, startIndex: int) -> Hierarchy:
+    '''`hierarchy` with new flags and start index, updating a component list comment'''
+    names = ' '.join(x for (i, x) in enumerate(COMPONENTS) if flags & (1 << i))
+    comment = COMPONENT_COMMENT.sub(f'( {names} )' if names else '( )', hierarchy.comment)
+    return replace(hierarchy, flags=flags, startIndex=startIndex, comment=comment)
+
+
+def foldConstants(anim, tolerance: float = 1e-6):
+    '''Fold animated components that stay within `tolerance` over every frame into the
+    baseframe, clearing their flags and renumbering `startIndex`. Takes and returns
+    an `AnimArrays` or `Md5Anim`.'''
+    if isinstance(anim, Md5Anim):
+        return foldConstants(AnimArrays.from_md5anim(anim), tolerance).to_md5anim()
+    if not anim.numFrames:
+        return anim
+    numJoints = len(anim.hierarchies)
+    animated = anim.components >= 0
+    columns = anim.components[animated]
+    low = anim.frames.min(axis=0)
+    high = anim.frames.max(axis=0)
+    constant = np.zeros(anim.components.shape, dtype=bool)
+    constant[animated] = (high - low)[columns] <= tolerance
+
+    baseframe = anim.baseframe.copy()
+    baseframe[:numJoints][constant] = ((low + high) / 2)[anim.components[constant]]
+
+    kept = animated & ~constant
+    counts = kept.sum(axis=1)
+    starts = (np.cumsum(counts) - counts).tolist()
+    bits = 1 << np.arange(len(COMPONENTS))
+    flags = (kept * bits).sum(axis=1).tolist()
+    hierarchies = [
+        withFlags(x, flag, start) if flag != x.flags else replace(x, startIndex=start)
+        for (x, flag, start) in zip(anim.hierarchies, flags, starts)]
+    return replace(
+        anim,
+        hierarchies=hierarchies,
+        frames=anim.frames[:, anim.components[kept]],
+        baseframe=baseframe,
+        partSizes=None)
+
+
+def interpolateFrames(anim: AnimArrays, times: np.ndarray) -> np.ndarray:
+    '''Frame matrix of `anim` at fractional frame `times`, copying whole frames as is'''
+    frames = componentsToFrames(anim, interpolateComponents(localComponents(anim), times))
+    exact = times == np.floor(times)
+    frames[exact] = anim.frames[times[exact].astype(np.intp)]
+    return frames
+
+
+def bracketBounds(bounds: np.ndarray, times: np.ndarray) -> np.ndarray:
+    '''Bounds at fractional frame `times`, each the union of the frames either side'''
+    first = np.floor(times).astype(np.intp)
+    second = np.ceil(times).astype(np.intp)
+    return np.stack([
+        np.minimum(bounds[first, 0], bounds[second, 0]),
+        np.maximum(bounds[first, 1], bounds[second, 1])], axis=1)
+
+
+def componentErrors(a: np.ndarray, b: np.ndarray):
+    '''Position distances and rotation angles (radians) between joint-local components
+    `a` and `b` (..., numJoints, 6)'''
+    positionErrors = np.linalg.norm(a[..., :3] - b[..., :3], axis=-1)
+    qa = normalizeQuaternions(expandQuaternions(a[..., 3:]))
+    qb = normalizeQuaternions(expandQuaternions(b[..., 3:]))
+    dot = np.clip(np.abs(np.sum(qa * qb, axis=-1)), 0.0, 1.0)
+    return (positionErrors, 2.0 * np.arccos(dot))
+
+
+def withinTolerance(approximate: np.ndarray, exact: np.ndarray, positionTolerance, angleTolerance) -> bool:
+    '''Whether every joint of `approximate` is within tolerance of `exact`. Tolerances
+    are scalars or per-joint arrays.'''
+    (positionErrors, angleErrors) = componentErrors(approximate, exact)
+    return bool((positionErrors <= positionTolerance).all() and (angleErrors <= angleTolerance).all())
+
+
+def keyframes(anim: AnimArrays, positionTolerance=0.01, angleTolerance=1e-3) -> np.ndarray:
+    '''Frame numbers to keep so that every dropped frame is rebuilt within tolerance by
+    interpolating between the kept frames either side. Each segment is grown from its
+    key by doubling its length until it fails, then binary searched for the longest
+    length that passes, so a hold of n frames takes O(log n) checks.'''
+    values = localComponents(anim)
+    numFrames = len(values)
+    if numFrames <= 2:
+        return np.arange(numFrames)
+    last = numFrames - 1
+
+    def fits(start: int, end: int) -> bool:
+        times = np.arange(1, end - start) / (end - start)
+        approximate = interpolateComponents(values[[start, end]], times)
+        return withinTolerance(approximate, values[start + 1:end], positionTolerance, angleTolerance)
+
+    keys = [0]
+    start = 0
+    while start < last:
+        # The next frame always fits, having nothing in between to rebuild
+        (good, bad, length) = (start + 1, None, 2)
+        while good < last:
+            end = min(start + length, last)
+            if not fits(start, end):
+                bad = end
+                break
+            (good, length) = (end, length * 2)
+        while bad is not None and bad - good > 1:
+            middle = (good + bad) // 2
+            if fits(start, middle):
+                good = middle
+            else:
+                bad = middle
+        keys.append(good)
+        start = good
+    return np.array(keys)
+
+
+@dataclass(frozen=True, eq=False)
+class KeyedClip:
+    '''Sparse form of a clip: `anim` holds only the frames listed in `keys`, and the
+    rest are rebuilt by interpolation'''
+    anim: AnimArrays
+    keys: np.ndarray  # (numKeys,) frame number of each row of anim.frames
+    numFrames: int
+
+    @classmethod
+    def reduce(cls, anim, positionTolerance=0.01, angleTolerance=1e-3) -> 'KeyedClip':
+        if isinstance(anim, Md5Anim):
+            anim = AnimArrays.from_md5anim(anim)
+        keys = keyframes(anim, positionTolerance, angleTolerance)
+        return cls(
+            anim=replace(anim, frames=anim.frames[keys], bounds=anim.bounds[keys]),
+            keys=keys,
+            numFrames=anim.numFrames)
+
+    def to_anim(self) -> AnimArrays:
+        '''Dense clip with every frame, bounds taken from the union of the bounds of
+        the keys either side'''
+        times = np.interp(np.arange(self.numFrames), self.keys, np.arange(len(self.keys)))
+        frames = interpolateFrames(self.anim, times)
+        return replace(self.anim, frames=frames, bounds=bracketBounds(self.anim.bounds, times))
+
+
+def decimate(anim, positionTolerance=0.01, angleTolerance=1e-3):
+    '''Lower the frame rate of a clip by the largest whole divisor of `frameRate` that
+    also divides the clip's length in frames, and whose dropped frames are all rebuilt
+    within tolerance by interpolation. Takes and
+    returns an `AnimArrays` or `Md5Anim`.'''
+    if isinstance(anim, Md5Anim):
+        return decimate(AnimArrays.from_md5anim(anim), positionTolerance, angleTolerance).to_md5anim()
+    values = localComponents(anim)
+    for step in range(anim.frameRate, 1, -1):
+        # The last frame must stay a key for the clip to keep its length
+        if anim.frameRate % step or (anim.numFrames - 1) % step or step >= anim.numFrames:
+            continue
+        approximate = interpolateComponents(values[::step], np.arange(anim.numFrames) / step)
+        if withinTolerance(approximate, values, positionTolerance, angleTolerance):
+            return replace(
+                anim,
+                frameRate=anim.frameRate // step,
+                frames=anim.frames[::step],
+                bounds=anim.bounds[::step])
+    return anim
+
+
+def resample(anim, frameRate: int, md5_mesh: Optional[Md5Mesh] = None):
+    '''Retime a clip to `frameRate`, interpolating all animated components at once. Bounds
+    are recomputed by skinning `md5_mesh` when given, or else taken from the union of
+    the source frames either side. Takes and returns an `AnimArrays` or `Md5Anim`.'''
+    if isinstance(anim, Md5Anim):
+        return resample(AnimArrays.from_md5anim(anim), frameRate, md5_mesh).to_md5anim()
+    if frameRate <= 0:
+        raise ValueError('frameRate must be positive')
+    if not anim.numFrames:
+        return replace(anim, frameRate=frameRate)
+    last = anim.numFrames - 1
+    numFrames = int(round(last * frameRate / anim.frameRate)) + 1
+    times = np.minimum(np.arange(numFrames) * anim.frameRate / frameRate, last)
+    result = replace(anim, frameRate=frameRate, frames=interpolateFrames(anim, times), partSizes=anim.layout)
+    if md5_mesh is not None:
+        return replace(result, bounds=animationBounds(md5_mesh, result))
+    return replace(result, bounds=bracketBounds(anim.bounds, times))
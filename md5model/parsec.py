@@ -439,12 +439,13 @@ def times(p, mint, maxt=None):
 
     @Parser
     def times_parser(text, index):
-        cnt, values, res = 0, Value.success(index, []), None
+        # Collect results in place; aggregating a new Value per match copies the
+        # whole list every iteration and makes repetition quadratic.
+        cnt, values, res = 0, [], None
         while cnt < maxt:
             res = p(text, index)
             if res.status:
-                values = values.aggregate(
-                    Value.success(res.index, [res.value]))
+                values.append(res.value)
                 index, cnt = res.index, cnt + 1
             else:
                 if cnt >= mint:
@@ -467,7 +468,7 @@ def times(p, mint, maxt=None):
                     r = p(text, index)
                     if index != r.index:  # report error when the parser cannot success with no text
                         return Value.failure(index, "already meets the end, no enough text")
-        return values
+        return Value.success(index, values)
     return times_parser
 
 
@@ -516,13 +517,13 @@ def separated(p, sep, mint, maxt=None, end=None):
 
     @Parser
     def sep_parser(text, index):
-        cnt, values, res = 0, Value.success(index, []), None
+        # Same in-place collection as `times`, see above.
+        cnt, values, res = 0, [], None
         while cnt < maxt:
             if end in [False, None] and cnt > 0:
                 res = sep(text, index)
                 if res.status:  # `sep` found, consume it (advance index)
-                    index, values = res.index, Value.success(
-                        res.index, values.value)
+                    index = res.index
                 elif cnt < mint:
                     return res  # error: need more elemnts, but no `sep` found.
                 else:
@@ -530,8 +531,7 @@ def separated(p, sep, mint, maxt=None, end=None):
 
             res = p(text, index)
             if res.status:
-                values = values.aggregate(
-                    Value.success(res.index, [res.value]))
+                values.append(res.value)
                 index, cnt = res.index, cnt + 1
             elif cnt >= mint:
                 break
@@ -541,14 +541,13 @@ def separated(p, sep, mint, maxt=None, end=None):
             if end is True:
                 res = sep(text, index)
                 if res.status:
-                    index, values = res.index, Value.success(
-                        res.index, values.value)
+                    index = res.index
                 else:
                     return res  # error: trailing `sep` not found
 
             if cnt >= maxt:
                 break
-        return values
+        return Value.success(index, values)
     return sep_parser
 
 
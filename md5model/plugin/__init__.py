@@ -46,7 +46,8 @@ class ImportMd5Anim(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
         pass
 
     def execute(self, context):
-        pass
+        from . import import_md5anim
+        return import_md5anim.load(self, context, self.filepath)
 
 
 class ExportMd5Mesh(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
@@ -81,7 +82,8 @@ class ExportMd5Anim(bpy.types.Operator, bpy_extras.io_utils.ImportHelper):
         pass
 
     def execute(self, context):
-        pass
+        from . import export_md5anim
+        return export_md5anim.save(self, context, self.filepath)
 
 
 def menu_func_import_mesh(self, context):
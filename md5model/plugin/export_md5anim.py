@@ -1,2 +1,66 @@
 import bpy
-from .. import md5anim
+import numpy as np
+from .. import optimize, pose, skinning
+from ..transforms import matricesToQuaternions
+from .export_md5mesh import vertex_weights
+from .skeleton import skeleton_table
+
+
+def sample_pose(scene, armature_object, frames) -> np.ndarray:
+    '''Armature-space matrices (numFrames, numBones, 4, 4) of every pose bone, read
+    with one `foreach_get` per frame in a single sweep over `frames`'''
+    pose_bones = armature_object.pose.bones
+    buffer = np.empty(len(pose_bones) * 16, dtype=np.float32)
+    matrices = np.empty((len(frames), len(pose_bones), 4, 4), dtype=np.float64)
+    current = scene.frame_current
+    for (i, frame) in enumerate(frames):
+        scene.frame_set(frame)
+        pose_bones.foreach_get('matrix', buffer)
+        # Matrices come out column by column
+        matrices[i] = buffer.reshape(-1, 4, 4).transpose(0, 2, 1)
+    scene.frame_set(current)
+    return matrices
+
+
+def save(operator, context, path):
+    collection = bpy.context.active_object.users_collection[0]
+
+    armature_object = next(
+        obj for obj in collection.objects
+        if obj.data in bpy.data.armatures[:]
+    )
+
+    scene = bpy.context.scene
+    frames = range(scene.frame_start, scene.frame_end + 1)
+    table = skeleton_table(armature_object)
+    matrices = sample_pose(scene, armature_object, frames)
+
+    positions = matrices[..., :3, 3]
+    orientations = matricesToQuaternions(matrices)
+    world_inverse = np.linalg.inv(np.array(armature_object.matrix_world, dtype=np.float64))
+    inverse_matrices = np.linalg.inv(table.matrices) @ world_inverse
+    mesh_bounds = [
+        skinning.skinnedBounds(vertex_weights(obj, table.indices, inverse_matrices), positions, orientations)
+        for obj in collection.objects
+        if obj.data in bpy.data.meshes[:]]
+    if mesh_bounds:
+        bounds = np.stack([
+            np.min([x[:, 0] for x in mesh_bounds], axis=0),
+            np.max([x[:, 1] for x in mesh_bounds], axis=0)], axis=1)
+    else:
+        bounds = np.stack([positions.min(axis=1), positions.max(axis=1)], axis=1)
+
+    anim = optimize.foldConstants(pose.animFromMatrices(
+        table.names,
+        table.parentIndices.tolist(),
+        table.matrices,
+        matrices,
+        bounds,
+        frameRate=scene.render.fps,
+        commandline=armature_object.get('commandline', '')))
+
+    f = open(path, 'w', encoding='utf-8')
+    anim.write(f)
+    f.close()
+
+    return set()
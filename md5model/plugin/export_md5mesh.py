@@ -1,9 +1,74 @@
 import bpy
-import bmesh
-from typing import List
+import numpy as np
+from typing import Dict, List
+from .. import arrays, skinning
+from ..arrays import MeshArrays
+from .skeleton import skeleton_table
 from ..md5mesh import Md5Mesh, Joint, Mesh, Vert, Tri, Weight
 
 
+def vertex_weights(mesh_object, bone_indices: Dict[str, int], inverse_matrices: np.ndarray) -> skinning.SkinWeights:
+    '''Read only the vertex positions and vertex group weights of `mesh_object` with
+    `foreach_get`, moving every weight into the space of its bone with
+    `inverse_matrices` (numBones, 4, 4)'''
+    vertices = mesh_object.data.vertices
+    num_verts = len(vertices)
+
+    co = np.empty(num_verts * 3, dtype=np.float32)
+    vertices.foreach_get('co', co)
+
+    group_bones = np.array(
+        [bone_indices.get(group.name, -1) for group in mesh_object.vertex_groups],
+        dtype=np.int32)
+    counts = np.fromiter((len(vert.groups) for vert in vertices), dtype=np.intp, count=num_verts)
+    groups = np.fromiter((x.group for vert in vertices for x in vert.groups), dtype=np.intp)
+    bias = np.fromiter((x.weight for vert in vertices for x in vert.groups), dtype=np.float64)
+    joint_index = group_bones[groups]
+    bound = joint_index >= 0
+    if not bound.all():
+        counts = np.bincount(np.repeat(np.arange(num_verts), counts)[bound], minlength=num_verts)
+        (joint_index, bias) = (joint_index[bound], bias[bound])
+
+    return skinning.SkinWeights.bind(
+        inverse_matrices, co.reshape(-1, 3).astype(np.float64), counts, joint_index, bias)
+
+
+def mesh_arrays(mesh_object, bone_indices: Dict[str, int], inverse_matrices: np.ndarray) -> MeshArrays:
+    '''Read `mesh_object` with `foreach_get` into `MeshArrays`, weights as in
+    `vertex_weights`'''
+    mesh_data = mesh_object.data
+    weights = vertex_weights(mesh_object, bone_indices, inverse_matrices)
+
+    loop_verts = np.empty(len(mesh_data.loops), dtype=np.int32)
+    mesh_data.loops.foreach_get('vertex_index', loop_verts)
+
+    polygons = mesh_data.polygons
+    loop_starts = np.empty(len(polygons), dtype=np.int32)
+    loop_totals = np.empty(len(polygons), dtype=np.int32)
+    polygons.foreach_get('loop_start', loop_starts)
+    polygons.foreach_get('loop_total', loop_totals)
+    if (loop_totals != 3).any():
+        raise ValueError(f'Mesh "{mesh_object.name}" must be triangulated')
+    tris = loop_verts[loop_starts[:, np.newaxis] + np.arange(3)]
+
+    loop_uvs = np.zeros(len(loop_verts) * 2, dtype=np.float32)
+    uv_layer = mesh_data.uv_layers.active
+    if uv_layer:
+        uv_layer.data.foreach_get('uv', loop_uvs)
+    uv = arrays.vertexValues(loop_verts, loop_uvs.reshape(-1, 2), weights.numVerts)
+
+    return MeshArrays(
+        comment=mesh_object.get('comment', ''),
+        shader=mesh_object.get('shader', ''),
+        uv=uv,
+        weightStart=weights.weightStart,
+        weightCount=weights.weightCount,
+        tris=tris.astype(np.int32),
+        jointIndex=weights.jointIndex,
+        bias=weights.bias,
+        position=weights.position)
+
+
 def save(operator, context, path):
     collection = bpy.context.active_object.users_collection[0]
 
@@ -14,83 +79,27 @@ def save(operator, context, path):
 
     commandline = armature_object.get('commandline', '')
 
-    joints: List[md5mesh.Joint] = []
-    for bone in armature_object.data.bones:
-        parent = bone.parent
-        parent_name = parent.name if parent else ''
-        parent_index = next(
-            i for i, other in enumerate(armature_object.data.bones)
-            if other == parent
-        ) if parent else -1
-        location, rotation, scale = bone.matrix_local.decompose()
-        joints.append(Joint(
-            name=bone.name,
-            parentIndex=parent_index,
-            position=location[:],
-            orientation=(-rotation.normalized())[1:],
-            comment=f' {parent_name}'))
+    table = skeleton_table(armature_object)
+    world_inverse = np.linalg.inv(np.array(armature_object.matrix_world, dtype=np.float64))
+    inverse_matrices = np.linalg.inv(table.matrices) @ world_inverse
 
     mesh_objects = [
         obj for obj in collection.objects
         if obj.data in bpy.data.meshes[:]
     ]
 
-    meshes: List[Mesh] = []
-    for mesh_object in mesh_objects:
-        shader = mesh_object.get('shader', '')
-        comment = mesh_object.get('comment', '')
-
-        tris = [
-            Tri(index=i, verts=poly.vertices)
-            for i, poly in enumerate(mesh_object.data.polygons)
-        ]
-
-        bm = bmesh.new()
-        bm.from_mesh(mesh_object.data)
-
-        uv_layer = bm.loops.layers.uv.active
-
-        verts: List[Vert] = []
-        weights: List[Weight] = []
-        for i, (vert, bm_vert) in enumerate(zip(mesh_object.data.vertices, bm.verts)):
-            uv = bm_vert.link_loops[0][uv_layer].uv
-            new_vert = Vert(
-                index=i,
-                uv=(uv.x, uv.y),
-                weightStart=len(weights),
-                weightCount=len(vert.groups))
-            verts.append(new_vert)
-            for vert_group in vert.groups:
-                bone = armature_object.data.bones[vert_group.group]
-                position = (
-                    bone.matrix_local.inverted() @
-                    armature_object.matrix_world.inverted() @
-                    vert.co.to_4d()
-                )
-                new_weight = Weight(
-                    index=len(weights),
-                    jointIndex=vert_group.group,
-                    bias=vert_group.weight,
-                    position=(position.x, position.y, position.z))
-                weights.append(new_weight)
-
-        bm.free()
-
-        meshes.append(Mesh(
-            comment=comment,
-            shader=shader,
-            verts=verts,
-            tris=tris,
-            weights=weights))
+    meshes: List[MeshArrays] = [
+        mesh_arrays(mesh_object, table.indices, inverse_matrices)
+        for mesh_object in mesh_objects]
 
     md5_mesh = Md5Mesh(
         version=10,
         commandline=commandline,
-        joints=joints,
+        joints=table.to_joints(),
         meshes=meshes)
 
     f = open(path, 'w', encoding='utf-8')
-    f.write(md5_mesh.to_string)
+    md5_mesh.write(f)
     f.close()
 
     return set()
@@ -1,2 +1,73 @@
 import bpy
-from .. import md5anim
+import numpy as np
+import os
+from .. import pose
+from ..cache import ParseCache
+from ..helpers import mappedFile
+from ..transforms import composeMatrices, matricesToQuaternions
+from .skeleton import skeleton_table
+
+
+def add_fcurve(action, data_path: str, index: int, group: str, frames: np.ndarray, values: np.ndarray):
+    '''Key `values` at `frames` on a new fcurve in one `foreach_set`'''
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    fcurve.keyframe_points.add(len(frames))
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    fcurve.keyframe_points.foreach_set('co', co.ravel())
+    fcurve.update()
+
+
+def load(operator, context, path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    with mappedFile(path) as data:
+        anim = ParseCache().parseMd5Anim(data)
+
+    armature_object = bpy.context.active_object
+    if not armature_object or armature_object.type != 'ARMATURE':
+        armature_object = armature_object.find_armature() if armature_object else None
+    if not armature_object:
+        operator.report({'ERROR'}, 'Select the armature to animate')
+        return {'CANCELLED'}
+
+    table = skeleton_table(armature_object)
+    joints = [
+        (i, table.indices[x.jointName])
+        for (i, x) in enumerate(anim.hierarchies)
+        if x.jointName in table.indices]
+    joint_indices = [i for (i, _) in joints]
+    bone_indices = [b for (_, b) in joints]
+    missing = [x.jointName for x in anim.hierarchies if x.jointName not in table.indices]
+    if missing:
+        operator.report({'WARNING'}, f'No bones for joints {", ".join(missing)} in {armature_object.name}')
+
+    # Pose bone basis = inverse(rest relative to parent) @ md5 joint-local transform
+    (positions, orientations) = pose.localPose(anim)
+    rest = pose.relativeMatrices(table.matrices, table.parentIndices)[bone_indices]
+    basis = np.linalg.inv(rest) @ composeMatrices(
+        positions[:, joint_indices], orientations[:, joint_indices])
+    locations = basis[..., :3, 3]
+    rotations = pose.continuousQuaternions(matricesToQuaternions(basis))
+
+    scene = bpy.context.scene
+    frames = scene.frame_start + np.arange(anim.numFrames)
+    scene.render.fps = anim.frameRate
+    scene.frame_end = scene.frame_start + max(anim.numFrames - 1, 0)
+
+    action = bpy.data.actions.new(name)
+    action['commandline'] = anim.commandline
+    if not armature_object.animation_data:
+        armature_object.animation_data_create()
+    armature_object.animation_data.action = action
+
+    for (i, bone_index) in enumerate(bone_indices):
+        bone_name = table.names[bone_index]
+        armature_object.pose.bones[bone_name].rotation_mode = 'QUATERNION'
+        path_prefix = f'pose.bones["{bone_name}"]'
+        for axis in range(3):
+            add_fcurve(action, f'{path_prefix}.location', axis, bone_name, frames, locations[:, i, axis])
+        for axis in range(4):
+            add_fcurve(action, f'{path_prefix}.rotation_quaternion', axis, bone_name, frames, rotations[:, i, axis])
+
+    return set()
@@ -1,9 +1,12 @@
 import bpy
-import functools
-import math
 import mathutils
+import numpy as np
 import os
 from typing import Tuple, List
+from .. import skinning
+from ..cache import ParseCache
+from ..helpers import mappedFile
+from ..transforms import JointTable
 from ..md5mesh import Md5Mesh, Joint, Mesh, Vert, Tri, Weight
 
 
@@ -12,26 +15,10 @@ BONE_TAIL = (0.0, 1.0, 0.0)
 BONE_LENGTH = 5.0
 
 
-@functools.lru_cache(maxsize=256)
-def compute_joint_matrix(joint: Joint) -> mathutils.Matrix:
-    '''Get the translation matrix for the joint (returns `mathutils.Matrix`)'''
-    (qx, qy, qz) = joint.orientation
-
-    t = 1.0 - (qx * qx) - (qy * qy) - (qz * qz)
-    qw = 0.0 if t < 0.0 else -math.sqrt(t)
-
-    q = -mathutils.Quaternion((qw, qx, qy, qz))
-    translation = mathutils.Matrix.Translation(joint.position)
-    return translation @ q.to_matrix().to_4x4()
-
-
 def load(operator, context, path):
     name = os.path.splitext(os.path.basename(path))[0]
-    f = open(path, 'r', encoding='utf-8')
-    data = f.read()
-    f.close()
-
-    md5_mesh: Md5Mesh = Md5Mesh.parse(data)
+    with mappedFile(path) as data:
+        md5_mesh: Md5Mesh = ParseCache().parseMd5Mesh(data)
 
     collection = bpy.data.collections.new(name)
     bpy.context.scene.collection.children.link(collection)
@@ -48,14 +35,15 @@ def load(operator, context, path):
     bpy.ops.object.mode_set()
     bpy.ops.object.mode_set(mode='EDIT')
 
-    for joint in md5_mesh.joints:
+    joint_table = JointTable.from_md5mesh(md5_mesh)
+    for (joint_index, joint) in enumerate(md5_mesh.joints):
         bone = armature_data.edit_bones.new(joint.name)
         if joint.parentIndex >= 0:
             parentName = md5_mesh.joints[joint.parentIndex].name
             bone.parent = armature_data.edit_bones[parentName]
         bone.head = BONE_HEAD
         bone.tail = BONE_TAIL
-        bone.matrix = compute_joint_matrix(joint)
+        bone.matrix = mathutils.Matrix(joint_table.matrices[joint_index].tolist())
         bone.length = BONE_LENGTH
 
     for bone in armature_data.bones:
@@ -63,19 +51,9 @@ def load(operator, context, path):
 
     for mesh in md5_mesh.meshes:
         mesh_name = mesh.comment.strip()
-        verts = []
-        for vert in mesh.verts:
-            weights = mesh.weights[vert.weightStart:vert.weightEnd]
-            global_vert_position = mathutils.Vector((0.0, 0.0, 0.0))
-            for weight in weights:
-                joint = md5_mesh.joints[weight.jointIndex]
-                joint_matrix = compute_joint_matrix(joint)
-                weight_position = mathutils.Vector(weight.position)
-                adjust = (joint_matrix @ weight_position) * weight.bias
-                global_vert_position += adjust
-            verts.append(global_vert_position)
+        verts = skinning.bindPose(joint_table, mesh).tolist()
         edges = []
-        faces = [x.verts for x in mesh.tris]
+        faces = mesh.tris.tolist()
 
         mesh_data = bpy.data.meshes.new(mesh_name)
         mesh_data.from_pydata(verts, edges, faces)
@@ -84,23 +62,19 @@ def load(operator, context, path):
         mesh_object['shader'] = mesh.shader
         mesh_object['comment'] = mesh.comment
 
-        for joint_index, joint in enumerate(md5_mesh.joints):
-            if joint_index in (weight.jointIndex for weight in mesh.weights):
-                vertex_group = mesh_object.vertex_groups.new(name=joint.name)
-                for vert in mesh.verts:
-                    for weight in mesh.weights[vert.weightStart:vert.weightEnd]:
-                        if joint_index == weight.jointIndex:
-                            vertex_group.add(
-                                index=[vert.index],
-                                weight=weight.bias,
-                                type='ADD')
+        for (joint_index, groups) in skinning.vertexGroups(mesh).items():
+            if 0 <= joint_index < len(md5_mesh.joints):
+                vertex_group = mesh_object.vertex_groups.new(name=md5_mesh.joints[joint_index].name)
+                for (bias, indices) in groups:
+                    vertex_group.add(
+                        index=indices,
+                        weight=bias,
+                        type='ADD')
 
         mesh_data.uv_layers.new(do_init=False)
-        vert_uvs = [vert.uv for vert in mesh.verts]
-        mesh_data.uv_layers[-1].data.foreach_set('uv', [
-            uv for pair in [
-                vert_uvs[loop.vertex_index] for loop in mesh_data.loops] for uv in pair
-        ])
+        loop_verts = np.empty(len(mesh_data.loops), dtype=np.int32)
+        mesh_data.loops.foreach_get('vertex_index', loop_verts)
+        mesh_data.uv_layers[-1].data.foreach_set('uv', mesh.uv[loop_verts].astype(np.float32).ravel())
 
         modifier = mesh_object.modifiers.new(name=mesh_name, type='ARMATURE')
         modifier.object = armature_object
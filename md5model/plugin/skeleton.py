@@ -0,0 +1,25 @@
+import functools
+import numpy as np
+from typing import Tuple
+from ..transforms import JointTable
+
+
+def skeleton_table(armature_object) -> JointTable:
+    '''Joint table of the bones of `armature_object` in bone order, shared by the
+    mesh and animation exporters. Tables are cached by bone names, parents and
+    `matrix_local`, so exporting many clips against one rig decomposes it once.'''
+    bones = armature_object.data.bones
+    names = tuple(bone.name for bone in bones)
+    parents = tuple(bone.parent.name if bone.parent else '' for bone in bones)
+    matrices = np.array([bone.matrix_local for bone in bones], dtype=np.float64).reshape(-1, 4, 4)
+    return cached_table(names, parents, matrices.tobytes())
+
+
+@functools.lru_cache(maxsize=32)
+def cached_table(names: Tuple[str, ...], parents: Tuple[str, ...], matrices: bytes) -> JointTable:
+    '''Build the joint table of a skeleton, resolving parents with its name map'''
+    indices = {name: i for (i, name) in enumerate(names)}
+    return JointTable.from_matrices(
+        names,
+        [indices[parent] if parent else -1 for parent in parents],
+        np.frombuffer(matrices, dtype=np.float64).reshape(-1, 4, 4))
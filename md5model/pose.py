@@ -0,0 +1,179 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Tuple
+from .arrays import AnimArrays
+from .md5anim import COMPONENTS, Hierarchy, Md5Anim
+from .transforms import (
+    composeMatrices, expandQuaternions, matricesToQuaternions, multiplyQuaternions, normalizeQuaternions,
+    rotateVectors, slerpQuaternions)
+
+
+def localComponents(anim: AnimArrays) -> np.ndarray:
+    '''Joint-local `(Tx, Ty, Tz, Qx, Qy, Qz)` of every joint in every frame, as a
+    (numFrames, numJoints, 6) array: baseframe values overwritten by the animated
+    components, gathered for all joints and frames at once through `components`.'''
+    numJoints = len(anim.hierarchies)
+    if len(anim.baseframe) < numJoints:
+        raise ValueError('Baseframe has fewer parts than hierarchy has joints')
+    values = np.empty((anim.numFrames, numJoints, 6), dtype=np.float64)
+    values[:] = anim.baseframe[:numJoints]
+    animated = anim.components >= 0
+    values[:, animated] = anim.frames[:, anim.components[animated]]
+    return values
+
+
+def componentsToFrames(anim: AnimArrays, values: np.ndarray) -> np.ndarray:
+    '''Frame matrix (numFrames, numAnimatedComponents) holding the animated columns of
+    joint-local components `values` (numFrames, numJoints, 6), the inverse of
+    `localComponents`'''
+    frames = np.empty((len(values), anim.numAnimatedComponents), dtype=np.float64)
+    animated = anim.components >= 0
+    frames[:, anim.components[animated]] = values[:, animated]
+    return frames
+
+
+def interpolateComponents(values: np.ndarray, times: np.ndarray) -> np.ndarray:
+    '''Joint-local components (numTimes, numJoints, 6) at fractional frame `times`
+    between the frames of `values` (numFrames, numJoints, 6): positions are lerped and
+    quaternions slerped, then stored with w <= 0 as `expandQuaternions` rebuilds it.
+    Times outside the clip are clamped to its ends.'''
+    times = np.asarray(times, dtype=np.float64)
+    last = len(values) - 1
+    first = np.clip(np.floor(times).astype(np.intp), 0, max(last - 1, 0))
+    second = np.minimum(first + 1, last)
+    t = np.clip(times - first, 0.0, 1.0)[:, np.newaxis]
+    (a, b) = (values[first], values[second])
+    positions = a[..., :3] + (b[..., :3] - a[..., :3]) * t[..., np.newaxis]
+    q = slerpQuaternions(
+        normalizeQuaternions(expandQuaternions(a[..., 3:])),
+        normalizeQuaternions(expandQuaternions(b[..., 3:])),
+        np.broadcast_to(t, a.shape[:-1]))
+    q = np.where(q[..., :1] > 0.0, -q, q)
+    return np.concatenate([positions, q[..., 1:]], axis=-1)
+
+
+def localPose(anim: AnimArrays) -> Tuple[np.ndarray, np.ndarray]:
+    '''Joint-local positions (numFrames, numJoints, 3) and `(w, x, y, z)` orientations
+    (numFrames, numJoints, 4) of every frame of `anim`'''
+    values = localComponents(anim)
+    return (values[..., :3], expandQuaternions(values[..., 3:]))
+
+
+def worldPose(positions: np.ndarray, orientations: np.ndarray, parentIndices: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    '''Model-space positions and orientations from joint-local ones (..., numJoints, 3)
+    and (..., numJoints, 4). The hierarchy is walked once, each joint composed with
+    its parent for every frame at once, so parents must come before their children.'''
+    worldPositions = np.array(positions, dtype=np.float64)
+    worldOrientations = np.array(orientations, dtype=np.float64)
+    for (i, parent) in enumerate(parentIndices):
+        if parent < 0:
+            continue
+        if parent >= i:
+            raise ValueError(f'Joint {i} comes before its parent {parent}')
+        parentOrientations = worldOrientations[..., parent, :]
+        worldPositions[..., i, :] = worldPositions[..., parent, :] + rotateVectors(parentOrientations, positions[..., i, :])
+        worldOrientations[..., i, :] = multiplyQuaternions(parentOrientations, orientations[..., i, :])
+    return (worldPositions, worldOrientations)
+
+
+@dataclass(frozen=True, eq=False)
+class Pose:
+    '''Joint-local and model-space transforms of every joint in every frame of a clip'''
+    names: List[str]
+    parentIndices: List[int]
+    localPositions: np.ndarray     # (numFrames, numJoints, 3)
+    localOrientations: np.ndarray  # (numFrames, numJoints, 4) as (w, x, y, z)
+    positions: np.ndarray          # (numFrames, numJoints, 3)
+    orientations: np.ndarray       # (numFrames, numJoints, 4) as (w, x, y, z)
+
+    @classmethod
+    def evaluate(cls, anim) -> 'Pose':
+        '''Evaluate every frame of an `AnimArrays` (or `Md5Anim`) at once'''
+        if isinstance(anim, Md5Anim):
+            anim = AnimArrays.from_md5anim(anim)
+        parentIndices = [x.parentJointIndex for x in anim.hierarchies]
+        (localPositions, localOrientations) = localPose(anim)
+        (positions, orientations) = worldPose(localPositions, localOrientations, parentIndices)
+        return cls(
+            names=[x.jointName for x in anim.hierarchies],
+            parentIndices=parentIndices,
+            localPositions=localPositions,
+            localOrientations=localOrientations,
+            positions=positions,
+            orientations=orientations)
+
+    @property
+    def numFrames(self) -> int:
+        return len(self.positions)
+
+    @property
+    def matrices(self) -> np.ndarray:
+        '''Model-space joint matrices (numFrames, numJoints, 4, 4)'''
+        return composeMatrices(self.positions, self.orientations)
+
+    @property
+    def localMatrices(self) -> np.ndarray:
+        '''Joint-local matrices (numFrames, numJoints, 4, 4)'''
+        return composeMatrices(self.localPositions, self.localOrientations)
+
+
+def relativeMatrices(matrices: np.ndarray, parentIndices: np.ndarray) -> np.ndarray:
+    '''Matrices (..., numJoints, 4, 4) relative to those of their parents, or as given
+    for roots'''
+    matrices = np.asarray(matrices, dtype=np.float64)
+    parentIndices = np.asarray(parentIndices)
+    relative = matrices.copy()
+    children = np.flatnonzero(parentIndices >= 0)
+    parents = parentIndices[children]
+    relative[..., children, :, :] = np.linalg.inv(matrices[..., parents, :, :]) @ matrices[..., children, :, :]
+    return relative
+
+
+def continuousQuaternions(q: np.ndarray) -> np.ndarray:
+    '''Negate quaternions of `q` (numFrames, ..., 4) where needed so each one is in the
+    same hemisphere as the one in the frame before, avoiding flips when keys are
+    interpolated'''
+    dots = np.sum(q[1:] * q[:-1], axis=-1, keepdims=True)
+    signs = np.cumprod(np.where(dots < 0.0, -1.0, 1.0), axis=0)
+    return np.concatenate([q[:1], q[1:] * signs], axis=0)
+
+
+def matrixComponents(matrices: np.ndarray) -> np.ndarray:
+    '''`(Tx, Ty, Tz, Qx, Qy, Qz)` (..., 6) of joint matrices (..., 4, 4), with the md5
+    sign convention (w <= 0) for the dropped quaternion w'''
+    matrices = np.asarray(matrices, dtype=np.float64)
+    orientations = -matricesToQuaternions(matrices)
+    return np.concatenate([matrices[..., :3, 3], orientations[..., 1:]], axis=-1)
+
+
+def animFromMatrices(
+        names: List[str],
+        parentIndices: List[int],
+        restMatrices: np.ndarray,
+        poseMatrices: np.ndarray,
+        bounds: np.ndarray,
+        frameRate: int,
+        commandline: str = '') -> AnimArrays:
+    '''Clip animating every component of every joint, from model-space rest matrices
+    (numJoints, 4, 4) and pose matrices (numFrames, numJoints, 4, 4). The baseframe is
+    the rest pose.'''
+    parentIndices = [int(x) for x in parentIndices]
+    numFrames = len(poseMatrices)
+    frames = matrixComponents(relativeMatrices(poseMatrices, parentIndices))
+    hierarchies = [
+        Hierarchy(
+            jointName=name,
+            parentJointIndex=parentIndex,
+            flags=(1 << len(COMPONENTS)) - 1,
+            startIndex=i * len(COMPONENTS),
+            comment=f' {names[parentIndex] if parentIndex >= 0 else ""} ( {" ".join(COMPONENTS)} )')
+        for (i, (name, parentIndex)) in enumerate(zip(names, parentIndices))]
+    return AnimArrays(
+        version=10,
+        commandline=commandline,
+        numJoints=len(names),
+        frameRate=frameRate,
+        hierarchies=hierarchies,
+        frames=frames.reshape(numFrames, -1),
+        baseframe=matrixComponents(relativeMatrices(restMatrices, parentIndices)),
+        bounds=np.asarray(bounds, dtype=np.float64).reshape(numFrames, 2, 3))
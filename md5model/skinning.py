@@ -0,0 +1,180 @@
+import numpy as np
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Tuple
+from .arrays import AnimArrays, MeshArrays
+from .md5anim import Md5Anim
+from .md5mesh import Md5Mesh
+from .pose import Pose
+from .transforms import JointTable, rotateVectors, transformPoints
+
+
+@dataclass(frozen=True, eq=False)
+class SkinWeights:
+    '''The weights of the verts of a mesh, all that skinning needs of it, without
+    the UVs or triangles of `MeshArrays`'''
+    weightStart: np.ndarray  # (numVerts,) int32
+    weightCount: np.ndarray  # (numVerts,) int32
+    jointIndex: np.ndarray   # (numWeights,) int32
+    bias: np.ndarray         # (numWeights,) float64
+    position: np.ndarray     # (numWeights, 3) float64
+
+    @classmethod
+    def bind(cls, inverseMatrices: np.ndarray, points: np.ndarray, weightCount: np.ndarray, jointIndex: np.ndarray, bias: np.ndarray) -> 'SkinWeights':
+        '''Weights, ordered vert by vert, that skin back to `points` (numVerts, 3) in
+        the bind pose, see `bindWeights`'''
+        weightCount = np.asarray(weightCount, dtype=np.int32)
+        return cls(
+            weightStart=(np.cumsum(weightCount) - weightCount).astype(np.int32),
+            weightCount=weightCount,
+            jointIndex=np.asarray(jointIndex, dtype=np.int32),
+            bias=np.asarray(bias, dtype=np.float64),
+            position=bindWeights(inverseMatrices, points, weightCount, jointIndex))
+
+    @property
+    def numVerts(self) -> int:
+        return len(self.weightCount)
+
+
+def asMeshArrays(mesh) -> MeshArrays:
+    '''`mesh` as `MeshArrays`, converting a `Mesh` if needed'''
+    return mesh if isinstance(mesh, MeshArrays) else MeshArrays.from_mesh(mesh)
+
+
+def weightOrder(mesh: MeshArrays) -> np.ndarray:
+    '''Indices of the weights of every vert, vert by vert'''
+    counts = mesh.weightCount.astype(np.intp)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(mesh.weightStart - offsets, counts) + np.arange(counts.sum())
+
+
+def sumPerVertex(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    '''Sum `values` (..., numSlots, 3), grouped vert by vert as in `weightOrder`, over
+    the weights of each vert'''
+    out = np.zeros(values.shape[:-2] + (len(counts), values.shape[-1]))
+    used = counts > 0
+    starts = (np.cumsum(counts) - counts)[used]
+    if len(starts):
+        out[..., used, :] = np.add.reduceat(values, starts, axis=-2)
+    return out
+
+
+def skinVertices(mesh: MeshArrays, positions: np.ndarray, orientations: np.ndarray) -> np.ndarray:
+    '''Vertex positions of `mesh` for joint `positions` (..., numJoints, 3) and
+    `(w, x, y, z)` joint `orientations` (..., numJoints, 4), in one batched pass.
+    Leading dimensions, such as frames, are carried through to the result.'''
+    order = weightOrder(mesh)
+    joints = mesh.jointIndex[order]
+    rotated = rotateVectors(orientations[..., joints, :], mesh.position[order])
+    weighted = (rotated + positions[..., joints, :]) * mesh.bias[order, np.newaxis]
+    return sumPerVertex(weighted, mesh.weightCount)
+
+
+def bindPose(joints: JointTable, mesh) -> np.ndarray:
+    '''Bind-pose vertex positions (numVerts, 3) of `mesh` from the joint transforms of
+    its md5mesh'''
+    return skinVertices(asMeshArrays(mesh), joints.positions, joints.orientations)
+
+
+def jointMap(md5_mesh: Md5Mesh, anim: AnimArrays) -> np.ndarray:
+    '''Index of each md5mesh joint among the joints of `anim`, matched by name'''
+    indices = {x.jointName: i for (i, x) in enumerate(anim.hierarchies)}
+    missing = [x.name for x in md5_mesh.joints if x.name not in indices]
+    if missing:
+        raise ValueError(f'Animation has no joints named {", ".join(missing)}')
+    return np.array([indices[x.name] for x in md5_mesh.joints], dtype=np.intp)
+
+
+def skinAnimation(md5_mesh: Md5Mesh, anim, start: int = 0, stop: Optional[int] = None) -> List[np.ndarray]:
+    '''Vertex positions (numFrames, numVerts, 3) of every mesh of `md5_mesh` in frames
+    `start` to `stop` of `anim`, an `AnimArrays` or `Md5Anim`'''
+    if isinstance(anim, Md5Anim):
+        anim = AnimArrays.from_md5anim(anim)
+    joints = jointMap(md5_mesh, anim)
+    pose = Pose.evaluate(anim.frameRange(start, anim.numFrames if stop is None else stop))
+    positions = pose.positions[:, joints]
+    orientations = pose.orientations[:, joints]
+    return [skinVertices(asMeshArrays(x), positions, orientations) for x in md5_mesh.meshes]
+
+
+def iterSkinnedFrames(
+        md5_mesh: Md5Mesh,
+        anim,
+        start: int = 0,
+        stop: Optional[int] = None,
+        chunkSize: int = 32) -> Iterator[List[np.ndarray]]:
+    '''Like `skinAnimation`, but yield the (numVerts, 3) positions of each mesh one
+    frame at a time, evaluating `chunkSize` frames at once'''
+    if isinstance(anim, Md5Anim):
+        anim = AnimArrays.from_md5anim(anim)
+    md5_mesh = replace(md5_mesh, meshes=[asMeshArrays(x) for x in md5_mesh.meshes])
+    stop = anim.numFrames if stop is None else min(stop, anim.numFrames)
+    for chunk in range(start, stop, chunkSize):
+        meshes = skinAnimation(md5_mesh, anim, chunk, min(chunk + chunkSize, stop))
+        for frame in range(len(meshes[0]) if meshes else min(chunkSize, stop - chunk)):
+            yield [x[frame] for x in meshes]
+
+
+def skinnedBounds(mesh, positions: np.ndarray, orientations: np.ndarray, chunkSize: int = 32) -> np.ndarray:
+    '''Per-frame bounds (numFrames, 2, 3) of `mesh` skinned by joint `positions`
+    (numFrames, numJoints, 3) and `orientations` (numFrames, numJoints, 4), skinning
+    `chunkSize` frames at a time to bound memory. `mesh` may be `SkinWeights`.'''
+    mesh = mesh if isinstance(mesh, SkinWeights) else asMeshArrays(mesh)
+    bounds = np.zeros((len(positions), 2, 3))
+    if not mesh.numVerts:
+        return bounds
+    for start in range(0, len(positions), chunkSize):
+        stop = start + chunkSize
+        verts = skinVertices(mesh, positions[start:stop], orientations[start:stop])
+        bounds[start:stop, 0] = verts.min(axis=-2)
+        bounds[start:stop, 1] = verts.max(axis=-2)
+    return bounds
+
+
+def animationBounds(md5_mesh: Md5Mesh, anim: AnimArrays, chunkSize: int = 32) -> np.ndarray:
+    '''Per-frame bounds (numFrames, 2, 3) of every mesh of `md5_mesh` together, skinned
+    by every frame of `anim`'''
+    joints = jointMap(md5_mesh, anim)
+    pose = Pose.evaluate(anim)
+    positions = pose.positions[:, joints]
+    orientations = pose.orientations[:, joints]
+    meshes = [asMeshArrays(x) for x in md5_mesh.meshes]
+    bounds = [skinnedBounds(x, positions, orientations, chunkSize) for x in meshes if x.numVerts]
+    if not bounds:
+        return np.zeros((anim.numFrames, 2, 3))
+    return np.stack([
+        np.min([x[:, 0] for x in bounds], axis=0),
+        np.max([x[:, 1] for x in bounds], axis=0)], axis=1)
+
+
+def bindWeights(inverseMatrices: np.ndarray, points: np.ndarray, weightCount: np.ndarray, jointIndex: np.ndarray) -> np.ndarray:
+    '''Weight positions (numWeights, 3) that skin back to `points` (numVerts, 3) in the
+    bind pose: each point moved into the space of its weight's joint by the inverse
+    bind matrices (numJoints, 4, 4). Weights are ordered vert by vert.'''
+    verts = np.repeat(np.arange(len(points)), weightCount)
+    return transformPoints(inverseMatrices[jointIndex], np.asarray(points)[verts])
+
+
+def vertexGroups(mesh) -> Dict[int, List[Tuple[float, List[int]]]]:
+    '''Invert the weights of `mesh` into joint index -> `[(bias, vertex indices)]`,
+    ordered by joint then bias, so a vertex group takes one `add` per distinct bias.
+    Repeated weights of a vert on the same joint are summed, like `add(type='ADD')`.'''
+    mesh = asMeshArrays(mesh)
+    order = weightOrder(mesh)
+    if not len(order):
+        return {}
+    numVerts = mesh.numVerts
+    verts = np.repeat(np.arange(numVerts, dtype=np.int64), mesh.weightCount)
+    keys = mesh.jointIndex[order].astype(np.int64) * numVerts + verts
+    (keys, inverse) = np.unique(keys, return_inverse=True)
+    bias = np.bincount(inverse.ravel(), weights=mesh.bias[order], minlength=len(keys))
+    (joints, verts) = np.divmod(keys, numVerts)
+
+    order = np.lexsort((verts, bias, joints))
+    (joints, bias, verts) = (joints[order], bias[order], verts[order])
+    breaks = np.flatnonzero((np.diff(joints) != 0) | (np.diff(bias) != 0)) + 1
+    starts = np.concatenate([[0], breaks])
+
+    groups = {}
+    for (joint, b, indices) in zip(joints[starts].tolist(), bias[starts].tolist(), np.split(verts, breaks)):
+        groups.setdefault(joint, []).append((b, indices.tolist()))
+    return groups
@@ -0,0 +1,171 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List
+from .md5mesh import Joint, Md5Mesh
+
+
+def expandQuaternions(xyz) -> np.ndarray:
+    '''Rebuild `(w, x, y, z)` quaternions from the `(x, y, z)` stored in md5 files,
+    taking the negative root for w (zero when the components are too long)'''
+    xyz = np.asarray(xyz, dtype=np.float64)
+    t = 1.0 - np.sum(xyz * xyz, axis=-1)
+    w = np.where(t < 0.0, 0.0, -np.sqrt(np.maximum(t, 0.0)))
+    return np.concatenate([w[..., np.newaxis], xyz], axis=-1)
+
+
+def conjugateQuaternions(q: np.ndarray) -> np.ndarray:
+    '''Conjugates of `(w, x, y, z)` quaternions `q` (..., 4)'''
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def normalizeQuaternions(q: np.ndarray) -> np.ndarray:
+    '''Unit length versions of quaternions `q` (..., 4)'''
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def multiplyQuaternions(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    '''Hamilton products `a * b` of `(w, x, y, z)` quaternions, rotating by `b` first'''
+    (aw, ax, ay, az) = np.moveaxis(np.asarray(a), -1, 0)
+    (bw, bx, by, bz) = np.moveaxis(np.asarray(b), -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw], axis=-1)
+
+
+def slerpQuaternions(a: np.ndarray, b: np.ndarray, t) -> np.ndarray:
+    '''Spherical interpolation from unit quaternions `a` to `b` (..., 4) by `t` (...),
+    along the shorter arc. Nearly equal pairs are interpolated linearly.'''
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)[..., np.newaxis]
+    dot = np.sum(a * b, axis=-1, keepdims=True)
+    b = np.where(dot < 0.0, -b, b)
+    theta = np.arccos(np.clip(np.abs(dot), 0.0, 1.0))
+    sin = np.sin(theta)
+    small = sin < 1e-6
+    safe = np.where(small, 1.0, sin)
+    wa = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    wb = np.where(small, t, np.sin(t * theta) / safe)
+    return normalizeQuaternions(wa * a + wb * b)
+
+
+def rotateVectors(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    '''Rotate vectors `v` (..., 3) by quaternions `q` (..., 4). Like
+    `mathutils.Quaternion.to_matrix`, `q` is not normalized first.'''
+    w = q[..., :1]
+    u = q[..., 1:]
+    uv = np.cross(u, v)
+    return v + 2.0 * (w * uv + np.cross(u, uv))
+
+
+def quaternionsToMatrices(q: np.ndarray) -> np.ndarray:
+    '''Rotation matrices (..., 3, 3) of quaternions `q` (..., 4), without normalizing
+    `q` first, as `mathutils.Quaternion.to_matrix` does'''
+    (w, x, y, z) = np.moveaxis(np.asarray(q, dtype=np.float64), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1)], axis=-2)
+
+
+def matricesToQuaternions(m: np.ndarray) -> np.ndarray:
+    '''Unit `(w, x, y, z)` quaternions with `w >= 0` of rotation matrices `m`
+    (..., 3, 3) or the rotation part of (..., 4, 4). Columns are normalized first,
+    so scale is ignored.'''
+    m = np.asarray(m, dtype=np.float64)[..., :3, :3]
+    m = m / np.linalg.norm(m, axis=-2, keepdims=True)
+    (m00, m11, m22) = (m[..., 0, 0], m[..., 1, 1], m[..., 2, 2])
+    # Take the root of the largest of 4w^2, 4x^2, 4y^2 and 4z^2 for stability
+    candidates = np.stack([
+        1 + m00 + m11 + m22,
+        1 + m00 - m11 - m22,
+        1 - m00 + m11 - m22,
+        1 - m00 - m11 + m22], axis=-1)
+    largest = np.argmax(candidates, axis=-1)
+    s = np.sqrt(np.maximum(np.take_along_axis(candidates, largest[..., np.newaxis], axis=-1)[..., 0], 1e-300)) * 2
+    (d21, d02, d10) = (m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1])
+    (s21, s02, s10) = (m[..., 2, 1] + m[..., 1, 2], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 0] + m[..., 0, 1])
+    q = np.select(
+        [largest[..., np.newaxis] == i for i in range(4)],
+        [
+            np.stack([s / 4, d21 / s, d02 / s, d10 / s], axis=-1),
+            np.stack([d21 / s, s / 4, s10 / s, s02 / s], axis=-1),
+            np.stack([d02 / s, s10 / s, s / 4, s21 / s], axis=-1),
+            np.stack([d10 / s, s02 / s, s21 / s, s / 4], axis=-1)])
+    q = np.where(q[..., :1] < 0, -q, q)
+    return normalizeQuaternions(q)
+
+
+def composeMatrices(positions: np.ndarray, orientations: np.ndarray) -> np.ndarray:
+    '''4x4 matrices (..., 4, 4) translating by `positions` (..., 3) after rotating by
+    quaternions `orientations` (..., 4)'''
+    positions = np.asarray(positions, dtype=np.float64)
+    m = np.zeros(positions.shape[:-1] + (4, 4))
+    m[..., :3, :3] = quaternionsToMatrices(orientations)
+    m[..., :3, 3] = positions
+    m[..., 3, 3] = 1.0
+    return m
+
+
+def transformPoints(m: np.ndarray, points: np.ndarray) -> np.ndarray:
+    '''Apply 4x4 matrices `m` (..., 4, 4) to `points` (..., 3)'''
+    points = np.asarray(points, dtype=np.float64)
+    return np.einsum('...ij,...j->...i', m[..., :3, :3], points) + m[..., :3, 3]
+
+
+@dataclass(frozen=True, eq=False)
+class JointTable:
+    '''Transforms of every joint of an md5mesh, indexed by joint index'''
+    names: List[str]
+    parentIndices: np.ndarray  # (numJoints,) int32
+    positions: np.ndarray      # (numJoints, 3)
+    orientations: np.ndarray   # (numJoints, 4) as (w, x, y, z)
+    matrices: np.ndarray       # (numJoints, 4, 4)
+    indices: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'indices', {name: i for (i, name) in enumerate(self.names)})
+
+    @classmethod
+    def from_joints(cls, joints: List[Joint]) -> 'JointTable':
+        positions = np.array([x.position for x in joints], dtype=np.float64).reshape(-1, 3)
+        orientations = expandQuaternions(np.array([x.orientation for x in joints], dtype=np.float64).reshape(-1, 3))
+        return cls(
+            names=[x.name for x in joints],
+            parentIndices=np.array([x.parentIndex for x in joints], dtype=np.int32),
+            positions=positions,
+            orientations=orientations,
+            matrices=composeMatrices(positions, orientations))
+
+    @classmethod
+    def from_matrices(cls, names: List[str], parentIndices: List[int], matrices: np.ndarray) -> 'JointTable':
+        '''Decompose joint `matrices` (numJoints, 4, 4) into positions and orientations,
+        taking the md5 sign convention (w <= 0) for the latter'''
+        matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+        return cls(
+            names=list(names),
+            parentIndices=np.array(parentIndices, dtype=np.int32).reshape(-1),
+            positions=matrices[:, :3, 3],
+            orientations=-matricesToQuaternions(matrices),
+            matrices=matrices)
+
+    @classmethod
+    def from_md5mesh(cls, md5_mesh: Md5Mesh) -> 'JointTable':
+        return cls.from_joints(md5_mesh.joints)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def to_joints(self) -> List[Joint]:
+        '''md5mesh joints of this table, each commented with its parent's name'''
+        return [
+            Joint(
+                name=name,
+                parentIndex=parentIndex,
+                position=tuple(position),
+                orientation=tuple(orientation[1:]),
+                comment=f' {self.names[parentIndex] if parentIndex >= 0 else ""}')
+            for (name, parentIndex, position, orientation) in zip(
+                self.names, self.parentIndices.tolist(), self.positions.tolist(), self.orientations.tolist())]
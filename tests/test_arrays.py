@@ -0,0 +1,169 @@
+import dataclasses
+import io
+import numpy as np
+import pytest
+from md5model import arrays
+from md5model import md5anim
+from md5model import md5mesh
+from . import test_md5anim
+from . import test_md5mesh
+
+
+class TestMeshArrays:
+    def test_from_mesh(self):
+        mesh = md5mesh.Mesh.parse(test_md5mesh.TestMesh.MESH_SAMPLE)
+        mesh_arrays = arrays.MeshArrays.from_mesh(mesh)
+        assert mesh_arrays.numVerts == 8
+        assert mesh_arrays.numTris == 4
+        assert mesh_arrays.numWeights == 17
+        assert mesh_arrays.uv.shape == (8, 2)
+        assert mesh_arrays.tris.shape == (4, 3)
+        assert mesh_arrays.position.shape == (17, 3)
+        assert mesh_arrays.tris[1].tolist() == [3, 1, 2]
+        assert mesh_arrays.weightEnd.tolist() == [x.weightEnd for x in mesh.verts]
+
+    def test_to_mesh(self):
+        mesh = md5mesh.Mesh.parse(test_md5mesh.TestMesh.MESH_SAMPLE)
+        assert arrays.MeshArrays.from_mesh(mesh).to_mesh() == mesh
+
+    def test_parse(self):
+        text = test_md5mesh.TestMesh.MESH_SAMPLE
+        mesh_arrays = arrays.MeshArrays.parse(text)
+        reference = arrays.MeshArrays.from_mesh(md5mesh.MeshParser.parse(text))
+        for name in ['uv', 'weightStart', 'weightCount', 'tris', 'jointIndex', 'bias', 'position']:
+            assert np.array_equal(getattr(mesh_arrays, name), getattr(reference, name))
+            assert getattr(mesh_arrays, name).dtype == getattr(reference, name).dtype
+
+    def test_tostring(self):
+        text = test_md5mesh.TestMesh.MESH_SAMPLE
+        assert arrays.MeshArrays.parse(text).to_string == text
+
+
+    def test_sparse_indices(self):
+        text = test_md5mesh.TestMesh.MESH_SAMPLE.replace('vert 1 ', 'vert 9 ')
+        assert text != test_md5mesh.TestMesh.MESH_SAMPLE
+        assert arrays.fastParseMeshArrays(text) is None
+        with pytest.raises(ValueError):
+            arrays.MeshArrays.parse(text)
+        assert md5mesh.Mesh.parse(text).to_string == text
+
+    def test_sequential(self):
+        assert arrays.isSequential(np.arange(3))
+        assert arrays.isSequential([])
+        assert not arrays.isSequential([0, 2, 1])
+
+
+class TestParseMd5Mesh:
+    def test_parse(self):
+        md5_mesh = arrays.parseMd5Mesh(test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE)
+        assert len(md5_mesh.joints) == 3
+        assert all(isinstance(x, arrays.MeshArrays) for x in md5_mesh.meshes)
+        assert md5_mesh.meshes[1].numTris == 3
+
+    def test_tostring(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE
+        assert arrays.parseMd5Mesh(text).to_string == text
+
+    def test_write(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE
+        f = io.StringIO()
+        arrays.parseMd5Mesh(text).write(f)
+        assert f.getvalue() == text
+
+    def test_round_trip(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE)
+        assert arrays.toMeshes(arrays.toArrays(md5_mesh)) == md5_mesh
+
+    def test_sparse_indices(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE.replace('tri 1 ', 'tri 7 ')
+        assert text != test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE
+        with pytest.raises(ValueError):
+            arrays.parseMd5Mesh(text)
+
+    def test_fallback(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE.replace('numMeshes 2', 'numMeshes 3')
+        with pytest.raises(AssertionError):
+            arrays.parseMd5Mesh(text)
+
+
+class TestAnimArrays:
+    def anim(self):
+        return md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE)
+
+    def test_from_md5anim(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        assert anim_arrays.frames.shape == (5, 11)
+        assert anim_arrays.baseframe.shape == (5, 6)
+        assert anim_arrays.bounds.shape == (5, 2, 3)
+        assert anim_arrays.partSizes == (2, 3, 6)
+        assert anim_arrays.frames[0, 2:5].tolist() == [-190.9219, 66.2344, 106.6172]
+        assert anim_arrays.bounds[1, 1].tolist() == [17.2734, 22.4531, 275.6641]
+
+    def test_dtype(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim(), dtype=np.float32)
+        assert anim_arrays.frames.dtype == np.float32
+
+    def test_to_md5anim(self):
+        anim = self.anim()
+        assert arrays.AnimArrays.from_md5anim(anim).to_md5anim() == anim
+
+    def test_tostring(self):
+        anim = arrays.AnimArrays.from_md5anim(self.anim()).to_md5anim()
+        assert anim.to_string == test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE
+
+    def test_write(self):
+        f = io.StringIO()
+        arrays.AnimArrays.from_md5anim(self.anim()).write(f)
+        assert f.getvalue() == test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE
+
+    def test_layout(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        assert dataclasses.replace(anim_arrays, partSizes=None).layout == (2, 3, 6)
+
+    def test_read(self):
+        anim_arrays = arrays.AnimArrays.read(io.StringIO(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+        reference = arrays.AnimArrays.from_md5anim(self.anim())
+        assert np.array_equal(anim_arrays.frames, reference.frames)
+        assert np.array_equal(anim_arrays.bounds, reference.bounds)
+        assert anim_arrays.partSizes == reference.partSizes
+
+    def test_read_frame_count(self):
+        for numFrames in ('numFrames 4', 'numFrames 6'):
+            text = test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE.replace('numFrames 5', numFrames)
+            with pytest.raises(md5anim.ParseError):
+                arrays.AnimArrays.read(io.StringIO(text))
+
+    def test_frame_range(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        clip = anim_arrays.frameRange(1, 3)
+        assert clip.numFrames == 2
+        assert np.shares_memory(clip.frames, anim_arrays.frames)
+        assert np.shares_memory(clip.bounds, anim_arrays.bounds)
+        assert clip.bounds[0].tolist() == anim_arrays.bounds[1].tolist()
+
+    def test_joint_components(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        components = anim_arrays.jointComponents(1)
+        assert components.shape == (5, 3)
+        assert np.shares_memory(components, anim_arrays.frames)
+        assert components[0].tolist() == [-190.9219, 66.2344, 106.6172]
+
+    def test_components(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        assert [tuple(x) for x in anim_arrays.components.tolist()] == self.anim().components
+        assert dataclasses.replace(anim_arrays, hierarchies=[]).components.shape == (0, 6)
+
+    def test_ragged(self):
+        anim = self.anim()
+        frames = anim.frames[:-1] + [md5anim.Frame(index=4, parts=[md5anim.FramePart(values=[1])])]
+        with pytest.raises(ValueError):
+            arrays.AnimArrays.from_md5anim(dataclasses.replace(anim, frames=frames))
+
+
+class TestVertexValues:
+    def test_first_loop(self):
+        loopVerts = np.array([2, 0, 1, 2, 1, 3])
+        loopValues = np.arange(12, dtype=np.float32).reshape(-1, 2)
+        values = arrays.vertexValues(loopVerts, loopValues, 5)
+        assert values.dtype == np.float64
+        assert values.tolist() == [[2, 3], [4, 5], [0, 1], [10, 11], [0, 0]]
@@ -0,0 +1,86 @@
+import dataclasses
+import io
+import numpy as np
+import pytest
+from md5model import arrays
+from md5model import binary
+from md5model import md5anim
+from md5model import md5mesh
+from . import test_md5anim
+from . import test_md5mesh
+
+
+class TestPackMesh:
+    def test_round_trip(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE
+        md5_mesh = binary.loads(binary.dumps(md5mesh.Md5Mesh.parse(text)))
+        assert all(isinstance(x, arrays.MeshArrays) for x in md5_mesh.meshes)
+        assert md5_mesh.to_string == text
+
+    def test_joints(self):
+        reference = md5mesh.Md5Mesh.parse(test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE)
+        md5_mesh = binary.loads(binary.dumps(reference))
+        assert md5_mesh.joints == reference.joints
+        assert arrays.toMeshes(md5_mesh) == reference
+
+    def test_zero_copy(self):
+        data = bytearray(binary.dumps(arrays.parseMd5Mesh(test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE)))
+        md5_mesh = binary.loads(memoryview(data))
+        position = md5_mesh.meshes[0].position
+        assert position.dtype == np.dtype('<f8')
+        assert not position.flags.owndata
+        data[:] = bytes(len(data))
+        assert not position.any()
+
+    def test_sparse_indices(self):
+        text = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE.replace('weight 1 ', 'weight 8 ')
+        assert text != test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE
+        with pytest.raises(ValueError):
+            binary.dumps(md5mesh.Md5Mesh.parse(text))
+
+
+class TestPackAnim:
+    def anim(self):
+        return md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE)
+
+    def test_round_trip(self):
+        anim = binary.loads(binary.dumps(self.anim()))
+        assert isinstance(anim, arrays.AnimArrays)
+        assert anim.partSizes == (2, 3, 6)
+        assert anim.to_string == test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE
+        assert anim.to_md5anim() == self.anim()
+
+    def test_part_sizes(self):
+        anim_arrays = arrays.AnimArrays.from_md5anim(self.anim())
+        anim_arrays = dataclasses.replace(anim_arrays, partSizes=None)
+        assert binary.loads(binary.dumps(anim_arrays)).partSizes is None
+
+    def test_file(self, tmp_path):
+        path = str(tmp_path / 'sample.md5b')
+        with open(path, 'wb') as f:
+            binary.dump(self.anim(), f)
+        anim = binary.load(path)
+        assert not anim.frames.flags.writeable
+        assert np.array_equal(anim.components, arrays.AnimArrays.from_md5anim(self.anim()).components)
+        assert anim.to_string == test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE
+
+
+class TestUnpack:
+    def test_alignment(self):
+        data = binary.dumps(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+        base = np.frombuffer(data, dtype=np.uint8).ctypes.data
+        (_, _, packed) = binary.unpackArrays(data)
+        assert all((x.ctypes.data - base) % binary.ALIGNMENT == 0 for x in packed if x.size)
+
+    def test_bad_magic(self):
+        with pytest.raises(ValueError):
+            binary.loads(b'MD5Version 10\n' + bytes(32))
+
+    def test_truncated(self):
+        data = binary.dumps(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+        with pytest.raises(ValueError):
+            binary.loads(data[:len(data) // 2])
+
+    def test_unknown_type(self):
+        with pytest.raises(TypeError):
+            binary.dumps(io.StringIO())
@@ -0,0 +1,103 @@
+import mmap
+import os
+import numpy as np
+import pytest
+from md5model import cache
+from md5model.parsec import ParseError
+from . import test_md5anim
+from . import test_md5mesh
+
+
+MESH = test_md5mesh.TestMd5Mesh.MD5MESH_SAMPLE.encode('utf-8')
+ANIM = test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE.encode('utf-8')
+
+
+def entries(parse_cache):
+    return sorted(x for x in os.listdir(parse_cache.directory) if x.endswith(cache.SUFFIX))
+
+
+class TestParseCache:
+    def test_mesh(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        assert parse_cache.parseMd5Mesh(MESH).to_string == MESH.decode('utf-8')
+        assert entries(parse_cache) == [parse_cache.key('md5mesh', MESH) + cache.SUFFIX]
+        assert parse_cache.parseMd5Mesh(MESH).to_string == MESH.decode('utf-8')
+
+    def test_anim(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        first = parse_cache.parseMd5Anim(ANIM)
+        second = parse_cache.parseMd5Anim(ANIM)
+        assert np.array_equal(first.frames, second.frames)
+        assert not second.frames.flags.writeable
+        assert second.to_string == ANIM.decode('utf-8')
+
+    def test_mmap(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path / 'cache'))
+        for (name, text, parse) in [('a.md5mesh', MESH, parse_cache.parseMd5Mesh), ('a.md5anim', ANIM, parse_cache.parseMd5Anim)]:
+            path = tmp_path / name
+            path.write_bytes(text)
+            with open(str(path), 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            assert parse(data).to_string == text.decode('utf-8')
+            assert parse(data).to_string == text.decode('utf-8')
+            data.close()
+
+    def test_hit(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        parse_cache.parseMd5Anim(ANIM)
+        calls = []
+        parse_cache.parse('md5anim', ANIM, calls.append)
+        assert calls == []
+
+    def test_detached(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        parse_cache.parseMd5Anim(ANIM)
+        key = parse_cache.key('md5anim', ANIM)
+        anim = parse_cache.get(key)
+        parse_cache.remove(key)
+        assert not os.path.exists(parse_cache.path(key))
+        assert anim.to_string == ANIM.decode('utf-8')
+
+    def test_key(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        assert parse_cache.key('md5mesh', MESH) != parse_cache.key('md5anim', MESH)
+        assert parse_cache.key('md5mesh', MESH) != parse_cache.key('md5mesh', MESH + b'\n')
+
+    def test_corrupt(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        parse_cache.parseMd5Mesh(MESH)
+        key = parse_cache.key('md5mesh', MESH)
+        with open(parse_cache.path(key), 'r+b') as f:
+            f.seek(100)
+            f.write(b'\xff')
+        assert parse_cache.get(key) is None
+        assert not os.path.exists(parse_cache.path(key))
+        assert parse_cache.parseMd5Mesh(MESH).to_string == MESH.decode('utf-8')
+
+    def test_empty(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        open(parse_cache.path('0'), 'wb').close()
+        assert parse_cache.get('0') is None
+        assert parse_cache.get('1') is None
+
+    def test_evict(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        parse_cache.parseMd5Mesh(MESH)
+        parse_cache.parseMd5Anim(ANIM)
+        os.utime(parse_cache.path(parse_cache.key('md5mesh', MESH)), (0, 0))
+        parse_cache.maxBytes = os.path.getsize(parse_cache.path(parse_cache.key('md5anim', ANIM)))
+        parse_cache.evict()
+        assert entries(parse_cache) == [parse_cache.key('md5anim', ANIM) + cache.SUFFIX]
+
+    def test_unwritable(self, tmp_path):
+        path = tmp_path / 'file'
+        path.write_bytes(b'')
+        parse_cache = cache.ParseCache(str(path / 'cache'))
+        assert parse_cache.parseMd5Mesh(MESH).to_string == MESH.decode('utf-8')
+
+    def test_empty_source(self, tmp_path):
+        parse_cache = cache.ParseCache(str(tmp_path))
+        with pytest.raises(ParseError):
+            parse_cache.parseMd5Mesh(b'')
+        with pytest.raises(ParseError):
+            parse_cache.parseMd5Anim(b'')
@@ -94,3 +94,67 @@ class TestDecimal:
     def test_nomatch(self):
         with pytest.raises(parsec.ParseError):
             helpers.decimal().parse('-4')
+
+
+class TestFormatNumbers:
+    VALUES = [0, -0.0, 1, -5.0, 0.5, -0.25, 100.0, 1e-11, -1e-11, 0.99999999995, -0.00000000005,
+              0.7071067812, -0.4571156754, 242.2109, 123456.123456789, 1e14 + 0.5, 1e16, 10**20 + 1]
+
+    def test_matches_formatnumber(self):
+        assert helpers.formatNumbers(self.VALUES) == [helpers.formatNumber(x) for x in self.VALUES]
+
+    def test_empty(self):
+        assert helpers.formatNumbers([]) == []
+
+    def test_tuple(self):
+        assert helpers.formatNumbers((1.5, -0.0, 2)) == ['1.5', '0', '2']
+
+    def test_nan(self):
+        with pytest.raises(ValueError):
+            helpers.formatNumbers([1.0, float('nan')])
+
+
+class TestIterString:
+    def test_iterstring(self):
+        assert helpers.concatFn(helpers.iterString(['a', 'b'], '<', ',', '>')) == '<a,b>'
+        assert helpers.concatFn(helpers.iterString([], '<', ',', '>')) == '<>'
+
+
+class TestBytesTokens:
+    def test_numbers(self):
+        assert helpers.toNumbers([b'1', b'-2.5']) == helpers.toNumbers(['1', '-2.5'])
+        assert [type(x) for x in helpers.toNumbers([b'1', b'-2.5'])] == [int, float]
+        assert helpers.toNumber(b'0.5') == 0.5
+
+    def test_matching(self):
+        pattern = helpers.re.compile(rf'\s*({helpers.NUMBER})')
+        assert helpers.matching(pattern, 'x') is pattern
+        assert helpers.matching(pattern, b' -1.5').match(b' -1.5').group(1) == b'-1.5'
+        assert helpers.matching(pattern, bytearray()) is helpers.matching(pattern, b'')
+
+    def test_text(self):
+        assert helpers.toText(b'caf\xc3\xa9') == 'caf\u00e9'
+        assert helpers.toText('x') == 'x'
+
+
+class TestMappedFile:
+    def test_map(self, tmp_path):
+        path = tmp_path / 'a.md5mesh'
+        path.write_bytes(b'MD5Version 10')
+        with helpers.mappedFile(str(path)) as data:
+            assert data[:10] == b'MD5Version'
+        assert data.closed
+
+    def test_empty(self, tmp_path):
+        path = tmp_path / 'empty.md5mesh'
+        path.write_bytes(b'')
+        with helpers.mappedFile(str(path)) as data:
+            assert data == b''
+
+    def test_error(self, tmp_path):
+        path = tmp_path / 'a.md5mesh'
+        path.write_bytes(b'MD5Version 10')
+        with pytest.raises(parsec.ParseError):
+            with helpers.mappedFile(str(path)) as data:
+                helpers.quoted().parse(data[:].decode('ascii'))
+        assert data.closed
@@ -1,3 +1,4 @@
+import io
 import pytest
 from md5model import md5anim
 
@@ -357,3 +358,135 @@ frame 4 {
         text = TestMd5Anim.MD5ANIM_SAMPLE
         anim = md5anim.Md5Anim.parse(text)
         assert anim.to_string == text
+
+    def test_components(self):
+        anim = md5anim.Md5Anim.parse(TestMd5Anim.MD5ANIM_SAMPLE)
+        assert anim.components == [
+            (0, 1, -1, -1, -1, -1),
+            (2, 3, 4, -1, -1, -1),
+            (5, 6, 7, 8, 9, 10)]
+
+    def test_write(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE
+        f = io.StringIO()
+        md5anim.Md5Anim.parse(text).write(f)
+        assert f.getvalue() == text
+
+    def test_write_header(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE
+        anim = md5anim.Md5Anim.parse(text)
+        f = io.StringIO()
+        anim.header.write(f, iter(anim.frames))
+        assert f.getvalue() == text
+
+
+class TestDecodeFrameParts:
+    REFERENCE = md5anim.block(md5anim.sepBy(md5anim.FramePartParser, md5anim.spaces1()))
+
+    def test_sample(self):
+        text = TestFrame.FRAME_SAMPLE
+        body = text[text.index('{') + 1:text.index('}')]
+        assert md5anim.decodeFrameParts(body) == TestDecodeFrameParts.REFERENCE.parse(text[text.index('{'):])
+
+    def test_types(self):
+        parts = md5anim.decodeFrameParts('\n\t0 -1 0.5\n')
+        assert parts[0].values == [0, -1, 0.5]
+        assert [type(x) for x in parts[0].values] == [int, int, float]
+
+    def test_spacing(self):
+        body = ' 1  2\t3 \n\n 4.5'
+        assert md5anim.decodeFrameParts(body) == TestDecodeFrameParts.REFERENCE.parse('{' + body + '}')
+
+    def test_unknown(self):
+        assert md5anim.decodeFrameParts('\n\t1 2 x\n') is None
+        assert md5anim.decodeFrameParts('\n\t1 2-3\n') is None
+
+    def test_empty(self):
+        assert md5anim.decodeFrameParts('\n\t\n') == []
+        assert TestDecodeFrameParts.REFERENCE.parse('{\n\t\n}') == []
+
+    def test_fallback(self):
+        with pytest.raises(md5anim.ParseError):
+            md5anim.Frame.parse('frame 0 {\n\t1 2 x\n}\n')
+
+
+class TestStream:
+    def test_stream(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE
+        anim = md5anim.Md5Anim.parse(text)
+        for chunkSize in [1, 7, 64, 1 << 16]:
+            (header, frames) = md5anim.Md5Anim.stream(io.StringIO(text), chunkSize=chunkSize)
+            assert header.numFrames == 5
+            assert header.hierarchies == anim.hierarchies
+            assert header.bounds == anim.bounds
+            assert header.baseframe == anim.baseframe
+            assert list(frames) == anim.frames
+
+    def test_binary(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE.replace('Lhand"', 'Lhand caf\u00e9"')
+        anim = md5anim.Md5Anim.parse(text)
+        for chunkSize in [1, 7, 1 << 16]:
+            (header, frames) = md5anim.Md5Anim.stream(io.BytesIO(text.encode('utf-8')), chunkSize=chunkSize)
+            assert header.commandline == anim.commandline
+            assert header.commandline.endswith('caf\u00e9')
+            assert list(frames) == anim.frames
+
+    def test_lazy(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE
+        f = io.StringIO(text)
+        (header, frames) = md5anim.Md5Anim.stream(f, chunkSize=16)
+        assert next(frames).index == 0
+        assert f.tell() < len(text)
+
+    def test_frame_count(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE.replace('numFrames 5', 'numFrames 6')
+        (header, frames) = md5anim.Md5Anim.stream(io.StringIO(text))
+        with pytest.raises(md5anim.ParseError):
+            list(frames)
+        with pytest.raises(md5anim.ParseError):
+            md5anim.Md5Anim.parse(text)
+
+    def test_indented_baseframe(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE.replace('\nbaseframe {', '\n\t baseframe {')
+        assert text != TestMd5Anim.MD5ANIM_SAMPLE
+        anim = md5anim.Md5Anim.parse(text)
+        for chunkSize in [1, 7, 1 << 16]:
+            (header, frames) = md5anim.Md5Anim.stream(io.StringIO(text), chunkSize=chunkSize)
+            assert header.baseframe == anim.baseframe
+            assert list(frames) == anim.frames
+
+    def test_header_scan(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE
+        end = text.index('}', text.index('\nbaseframe')) + 1
+        f = io.StringIO(text)
+        md5anim.Md5Anim.stream(f, chunkSize=1)
+        assert f.tell() == end
+
+    def test_truncated(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE[:-20]
+        (header, frames) = md5anim.Md5Anim.stream(io.StringIO(text))
+        with pytest.raises(md5anim.ParseError):
+            list(frames)
+        with pytest.raises(md5anim.ParseError):
+            md5anim.Md5Anim.parse(text)
+
+    def test_bad_header(self):
+        text = TestMd5Anim.MD5ANIM_SAMPLE.replace('hierarchy {', 'hierarchy')
+        with pytest.raises(md5anim.ParseError):
+            md5anim.Md5Anim.stream(io.StringIO(text))
+
+
+class TestComponentTable:
+    def test_sparse(self):
+        hierarchies = [
+            md5anim.Hierarchy(jointName='a', parentJointIndex=-1, flags=0, startIndex=0, comment=''),
+            md5anim.Hierarchy(jointName='b', parentJointIndex=0, flags=0b101010, startIndex=0, comment=''),
+            md5anim.Hierarchy(jointName='c', parentJointIndex=1, flags=0b000001, startIndex=3, comment='')]
+        assert md5anim.componentTable(hierarchies) == [
+            (-1, -1, -1, -1, -1, -1),
+            (-1, 0, -1, 1, -1, 2),
+            (3, -1, -1, -1, -1, -1)]
+
+    def test_expanded_flags(self):
+        hierarchy = md5anim.Hierarchy(jointName='b', parentJointIndex=0, flags=0b000101, startIndex=0, comment='')
+        assert hierarchy.expanded_flags == [True, False, True, False, False, False]
@@ -1,3 +1,5 @@
+import io
+import mmap
 import pytest
 from md5model import md5mesh
 
@@ -219,3 +221,71 @@ mesh {
     def test_tostring(self):
         assert md5mesh.Md5Mesh.parse(
             TestMd5Mesh.MD5MESH_SAMPLE).to_string == TestMd5Mesh.MD5MESH_SAMPLE
+
+    def test_write(self):
+        f = io.StringIO()
+        md5mesh.Md5Mesh.parse(TestMd5Mesh.MD5MESH_SAMPLE).write(f)
+        assert f.getvalue() == TestMd5Mesh.MD5MESH_SAMPLE
+
+    def test_write_empty(self):
+        mesh = md5mesh.Md5Mesh(version=10, commandline='', joints=[], meshes=[
+            md5mesh.Mesh(comment=' empty', shader='', verts=[], tris=[], weights=[])])
+        f = io.StringIO()
+        mesh.write(f)
+        assert f.getvalue() == mesh.to_string
+        assert 'joints {\n\t\n}\n\n' in f.getvalue()
+
+
+class TestFastParse:
+    def test_md5mesh(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE
+        fast = md5mesh.fastParseMd5Mesh(text)
+        assert fast is not None
+        assert fast == md5mesh.Md5MeshParser.parse(text)
+
+    def test_md5mesh_types(self):
+        fast = md5mesh.fastParseMd5Mesh(TestMd5Mesh.MD5MESH_SAMPLE)
+        reference = md5mesh.Md5MeshParser.parse(TestMd5Mesh.MD5MESH_SAMPLE)
+        assert [type(c) for c in fast.joints[2].position] == [type(c) for c in reference.joints[2].position]
+        assert [type(c) for c in fast.meshes[0].weights[0].position] == [type(c) for c in reference.meshes[0].weights[0].position]
+
+    def test_mesh(self):
+        (mesh, index) = md5mesh.fastParseMesh(TestMesh.MESH_SAMPLE)
+        assert index == len(TestMesh.MESH_SAMPLE)
+        assert mesh == md5mesh.MeshParser.parse(TestMesh.MESH_SAMPLE)
+
+    def test_bytes(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE
+        fast = md5mesh.fastParseMd5Mesh(text.encode('utf-8'))
+        assert fast == md5mesh.fastParseMd5Mesh(text)
+        assert isinstance(fast.joints[0].name, str)
+        assert isinstance(fast.meshes[0].shader, str)
+
+    def test_mmap(self, tmp_path):
+        path = tmp_path / 'sample.md5mesh'
+        path.write_bytes(TestMd5Mesh.MD5MESH_SAMPLE.encode('utf-8'))
+        with open(str(path), 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        assert md5mesh.Md5Mesh.parse(data) == md5mesh.Md5Mesh.parse(TestMd5Mesh.MD5MESH_SAMPLE)
+        data.close()
+
+    def test_bytes_fallback(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE.replace('numMeshes 2', 'numMeshes 3').encode('utf-8')
+        assert md5mesh.fastParseMd5Mesh(text) is None
+        with pytest.raises(AssertionError):
+            md5mesh.Md5Mesh.parse(text)
+
+    def test_unknown(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE.replace('( 0.53591 0.438716 )', '( 0.53591 )')
+        assert md5mesh.fastParseMd5Mesh(text) is None
+
+    def test_fallback_error(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE.replace('numMeshes 2', 'numMeshes 3')
+        assert md5mesh.fastParseMd5Mesh(text) is None
+        with pytest.raises(AssertionError):
+            md5mesh.Md5Mesh.parse(text)
+
+    def test_fallback_parse_error(self):
+        text = TestMd5Mesh.MD5MESH_SAMPLE.replace('joints {', 'joints')
+        with pytest.raises(md5mesh.ParseError):
+            md5mesh.Md5Mesh.parse(text)
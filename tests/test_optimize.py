@@ -0,0 +1,182 @@
+import dataclasses
+import io
+import numpy as np
+import pytest
+from md5model import arrays
+from md5model import md5anim
+from md5model import md5mesh
+from md5model import optimize
+from md5model import pose
+from md5model import skinning
+from md5model import transforms
+from . import test_md5anim, test_skinning
+
+
+def sample():
+    return arrays.AnimArrays.from_md5anim(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+
+
+class TestFoldConstants:
+    def test_all_constant(self):
+        anim = optimize.foldConstants(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+        assert isinstance(anim, md5anim.Md5Anim)
+        assert anim.numAnimatedComponents == 0
+        assert [(x.flags, x.startIndex, x.comment) for x in anim.hierarchies] == [
+            (0, 0, '  ( )'), (0, 0, ' origin ( )'), (0, 0, ' origin ( )')]
+        assert md5anim.Md5Anim.parse(anim.to_string) == anim
+        (header, frames) = md5anim.Md5Anim.stream(io.StringIO(anim.to_string))
+        assert [x.parts for x in frames] == [[]] * 5
+
+    def test_partial(self):
+        anim = sample()
+        frames = anim.frames.copy()
+        frames[:, 3] = np.linspace(60, 70, 5)
+        frames[:, 8] += [0, 1e-8, 0, -1e-8, 0]
+        frames[:, 10] = np.linspace(0, 0.1, 5)
+        anim = dataclasses.replace(anim, frames=frames)
+        result = optimize.foldConstants(anim)
+        assert [(x.flags, x.startIndex) for x in result.hierarchies] == [(0, 0), (2, 0), (32, 1)]
+        assert result.hierarchies[1].comment == ' origin ( Ty )'
+        assert result.frames.tolist() == frames[:, [3, 10]].tolist()
+        assert result.baseframe[1, 0] == -190.9219
+        assert np.allclose(result.baseframe[2, 3], -0.0326106442)
+        assert result.baseframe[3:].tolist() == anim.baseframe[3:].tolist()
+        assert np.allclose(pose.localComponents(result), pose.localComponents(anim), atol=1e-6)
+
+    def test_tolerance(self):
+        anim = sample()
+        frames = anim.frames.copy()
+        frames[:, 0] += [0, 0.01, 0, 0, 0]
+        anim = dataclasses.replace(anim, frames=frames)
+        assert optimize.foldConstants(anim).numAnimatedComponents == 1
+        folded = optimize.foldConstants(anim, tolerance=0.1)
+        assert folded.numAnimatedComponents == 0
+        assert folded.baseframe[0, 0] == 0.005
+
+    def test_no_frames(self):
+        anim = sample().frameRange(0, 0)
+        assert optimize.foldConstants(anim) is anim
+
+
+def motion(numFrames, curve=lambda t: t):
+    '''Three joint clip whose root slides and turns by `curve` of the frame time'''
+    names = ['root', 'arm', 'hand']
+    parents = [-1, 0, 1]
+    rest = np.stack([
+        transforms.composeMatrices([0, 0, 0], [1, 0, 0, 0]),
+        transforms.composeMatrices([0, 0, 10], [1, 0, 0, 0]),
+        transforms.composeMatrices([5, 0, 10], [1, 0, 0, 0])])
+    t = curve(np.linspace(0, 1, numFrames))
+    angles = t * np.pi / 2
+    root = transforms.composeMatrices(
+        np.stack([t * 20, np.zeros_like(t), np.zeros_like(t)], axis=-1),
+        np.stack([np.cos(angles / 2), np.zeros_like(t), np.zeros_like(t), np.sin(angles / 2)], axis=-1))
+    poses = root[:, np.newaxis] @ rest
+    return pose.animFromMatrices(names, parents, rest, poses, np.zeros((numFrames, 2, 3)), 24, 'motion')
+
+
+class TestKeyframes:
+    def test_linear(self):
+        assert optimize.keyframes(motion(25)).tolist() == [0, 24]
+
+    def test_curved(self):
+        anim = motion(25, lambda t: t * t)
+        keys = optimize.keyframes(anim, positionTolerance=0.05, angleTolerance=0.01)
+        assert 2 < len(keys) < 25
+        assert keys[0] == 0 and keys[-1] == 24
+
+    def test_short(self):
+        assert optimize.keyframes(motion(2)).tolist() == [0, 1]
+
+    def test_long_hold(self, monkeypatch):
+        calls = []
+        withinTolerance = optimize.withinTolerance
+        monkeypatch.setattr(optimize, 'withinTolerance', lambda *args: calls.append(1) or withinTolerance(*args))
+        assert optimize.keyframes(motion(1025)).tolist() == [0, 1024]
+        assert len(calls) <= 11
+
+    def test_keyed_clip(self):
+        anim = motion(25, lambda t: t * t)
+        clip = optimize.KeyedClip.reduce(anim, positionTolerance=0.05, angleTolerance=0.01)
+        assert clip.anim.numFrames == len(clip.keys)
+        dense = clip.to_anim()
+        assert dense.numFrames == 25
+        assert np.array_equal(dense.frames[clip.keys], anim.frames[clip.keys])
+        (positionErrors, angleErrors) = optimize.componentErrors(pose.localComponents(dense), pose.localComponents(anim))
+        assert positionErrors.max() <= 0.05
+        assert angleErrors.max() <= 0.01
+
+
+class TestDecimate:
+    def test_linear(self):
+        result = optimize.decimate(motion(25))
+        assert result.frameRate == 1
+        assert result.numFrames == 2
+
+    def test_curved(self):
+        anim = motion(25, lambda t: t * t)
+        result = optimize.decimate(anim, positionTolerance=0.2, angleTolerance=0.02)
+        assert 1 < result.frameRate < 24
+        assert 24 % result.frameRate == 0
+        step = 24 // result.frameRate
+        assert np.array_equal(result.frames, anim.frames[::step])
+
+    def test_keeps_last_frame(self):
+        anim = motion(27)
+        result = optimize.decimate(anim)
+        assert result.frameRate == 12
+        assert result.numFrames == 14
+        assert np.array_equal(result.frames[-1], anim.frames[-1])
+
+    def test_uneven_length(self):
+        anim = motion(30)
+        assert optimize.decimate(anim) is anim
+
+    def test_md5anim(self):
+        anim = md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE)
+        result = optimize.decimate(anim)
+        assert isinstance(result, md5anim.Md5Anim)
+        assert result.frameRate == 6
+        assert len(result.frames) == 2
+
+
+class TestResample:
+    def test_same_rate(self):
+        anim = motion(25, lambda t: t * t)
+        result = optimize.resample(anim, 24)
+        assert np.array_equal(result.frames, anim.frames)
+        assert np.array_equal(result.bounds, anim.bounds)
+
+    def test_double_rate(self):
+        anim = motion(25)
+        result = optimize.resample(anim, 48)
+        assert result.frameRate == 48
+        assert result.numFrames == 49
+        assert np.array_equal(result.frames[::2], anim.frames)
+        assert np.allclose(pose.localComponents(result), pose.localComponents(motion(49)))
+
+    def test_half_rate(self):
+        anim = motion(25)
+        result = optimize.resample(anim, 12)
+        assert result.numFrames == 13
+        assert np.array_equal(result.frames, anim.frames[::2])
+
+    def test_bounds(self):
+        anim = optimize.resample(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE), 48)
+        assert len(anim.frames) == 9
+        assert anim.bounds[1].min == (-29.7891, -29.7891, 191.4453)
+        assert anim.bounds[1].max == (17.2734, 22.4531, 275.6641)
+
+    def test_mesh_bounds(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        anim = pose.animFromMatrices(
+            joints.names, joints.parentIndices, joints.matrices, np.stack([joints.matrices] * 3), np.zeros((3, 2, 3)), 24, 'mesh')
+        result = optimize.resample(anim, 36, md5_mesh)
+        assert result.numFrames == 4
+        points = np.concatenate([skinning.bindPose(joints, x) for x in md5_mesh.meshes])
+        assert np.allclose(result.bounds, [points.min(axis=0), points.max(axis=0)])
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            optimize.resample(motion(3), 0)
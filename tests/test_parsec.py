@@ -0,0 +1,49 @@
+import pytest
+from md5model import parsec
+
+
+class TestTimes:
+    def test_many(self):
+        assert parsec.many(parsec.digit()).parse('123x') == ['1', '2', '3']
+
+    def test_many_empty(self):
+        assert parsec.many(parsec.digit()).parse('x') == []
+
+    def test_many1_insufficient(self):
+        with pytest.raises(parsec.ParseError):
+            parsec.many1(parsec.digit()).parse('x')
+
+    def test_count(self):
+        assert parsec.count(parsec.digit(), 2).parse('123') == ['1', '2']
+
+    def test_count_insufficient(self):
+        with pytest.raises(parsec.ParseError):
+            parsec.count(parsec.digit(), 4).parse('123')
+
+    def test_index(self):
+        assert parsec.many1(parsec.digit()).parse_partial('123abc') == (['1', '2', '3'], 'abc')
+
+    def test_large(self):
+        assert len(parsec.many1(parsec.digit()).parse('7' * 50000)) == 50000
+
+
+class TestSeparated:
+    def test_sepby1(self):
+        assert parsec.sepBy1(parsec.digit(), parsec.string(',')).parse('1,2,3') == ['1', '2', '3']
+
+    def test_sepby1_trailing(self):
+        assert parsec.sepBy1(parsec.digit(), parsec.string(',')).parse_partial('1,2,x') == (['1', '2'], 'x')
+
+    def test_sepby1_insufficient(self):
+        with pytest.raises(parsec.ParseError):
+            parsec.sepBy1(parsec.digit(), parsec.string(',')).parse('x')
+
+    def test_sepby(self):
+        assert parsec.sepBy(parsec.digit(), parsec.string(',')).parse('x') == []
+
+    def test_endby1(self):
+        assert parsec.endBy1(parsec.digit(), parsec.string(';')).parse_partial('1;2;x') == (['1', '2'], 'x')
+
+    def test_endby1_missing_end(self):
+        with pytest.raises(parsec.ParseError):
+            parsec.endBy1(parsec.digit(), parsec.string(';')).parse('1;2')
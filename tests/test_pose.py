@@ -0,0 +1,124 @@
+import dataclasses
+import io
+import numpy as np
+import pytest
+from md5model import arrays
+from md5model import md5anim
+from md5model import md5mesh
+from md5model import pose
+from md5model import transforms
+from . import test_md5anim, test_skinning
+
+
+def sample():
+    return arrays.AnimArrays.from_md5anim(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+
+
+class TestLocalPose:
+    def test_components(self):
+        anim = sample()
+        values = pose.localComponents(anim)
+        assert values.shape == (5, 3, 6)
+        assert values[0].tolist() == [
+            [0, 0, 0, -0.7071067812, 0, 0],
+            [-190.9219, 66.2344, 106.6172, 0, 0, 0],
+            [-0.4375, 242.2109, 0.5078, -0.0326106442, -0.938224635, 0.0516446341]]
+
+    def test_animated(self):
+        anim = sample()
+        frames = anim.frames.copy()
+        frames[:, 1] = np.arange(5)
+        frames[:, 8] = 0.5
+        values = pose.localComponents(dataclasses.replace(anim, frames=frames))
+        assert values[:, 0, 1].tolist() == [0, 1, 2, 3, 4]
+        assert (values[:, 2, 3] == 0.5).all()
+
+    def test_pose(self):
+        (positions, orientations) = pose.localPose(sample())
+        assert positions.shape == (5, 3, 3)
+        assert orientations.shape == (5, 3, 4)
+        assert np.allclose(orientations[0, 0], [-0.7071067812, -0.7071067812, 0, 0])
+
+
+class TestRelativeMatrices:
+    def test_inverse_of_compose(self):
+        q = transforms.expandQuaternions([[0, 0, -0.7071067812], [0.3, -0.2, 0.1], [0.1, 0.5, -0.4]])
+        local = transforms.composeMatrices([[1, 2, 3], [0, 5, 0], [-1, 0, 2]], q)
+        world = local.copy()
+        world[1] = world[0] @ local[1]
+        world[2] = world[1] @ local[2]
+        assert np.allclose(pose.relativeMatrices(world, [-1, 0, 1]), local)
+
+
+class TestContinuousQuaternions:
+    def test_flips(self):
+        q = np.array([[1, 0, 0, 0], [-1, 0, 0, 0], [-0.9, -0.1, 0, 0], [0.9, 0.1, 0, 0]], dtype=np.float64)
+        result = pose.continuousQuaternions(q)
+        assert (result[:, 0] > 0).all()
+
+
+class TestAnimFromMatrices:
+    def test_round_trip(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        offset = transforms.composeMatrices([0, 0, 2], transforms.expandQuaternions([0.1, 0, 0]))
+        poses = np.stack([joints.matrices, offset @ joints.matrices])
+        bounds = np.zeros((2, 2, 3))
+        anim = pose.animFromMatrices(joints.names, joints.parentIndices, joints.matrices, poses, bounds, 24, 'test')
+        assert anim.numFrames == 2
+        assert anim.numAnimatedComponents == 18
+        assert [x.startIndex for x in anim.hierarchies] == [0, 6, 12]
+        assert anim.hierarchies[1].comment == ' origin ( Tx Ty Tz Qx Qy Qz )'
+        rest = pose.relativeMatrices(joints.matrices, joints.parentIndices)
+        baseframe = transforms.composeMatrices(anim.baseframe[:, :3], transforms.expandQuaternions(anim.baseframe[:, 3:]))
+        assert np.allclose(baseframe, rest)
+        assert (anim.baseframe[0] == anim.frames[0, :6]).all()
+        (positions, orientations) = pose.localPose(anim)
+        local = transforms.composeMatrices(positions, orientations)
+        assert np.allclose(local[0], rest)
+        assert np.allclose(local[1, 0], offset @ rest[0])
+        assert np.allclose(local[1, 1:], rest[1:])
+
+    def test_write(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        anim = pose.animFromMatrices(
+            joints.names, joints.parentIndices, joints.matrices, joints.matrices[np.newaxis], np.zeros((1, 2, 3)), 24, 'test')
+        f = io.StringIO()
+        anim.write(f)
+        parsed = md5anim.Md5Anim.parse(f.getvalue())
+        assert parsed.to_string == f.getvalue()
+        assert len(parsed.frames) == 1
+        assert [len(x.values) for x in parsed.frames[0].parts] == [6, 6, 6]
+
+
+class TestPose:
+    def test_sample(self):
+        result = pose.Pose.evaluate(md5anim.Md5Anim.parse(test_md5anim.TestMd5Anim.MD5ANIM_SAMPLE))
+        assert result.names == ['origin', 'target', 'waist']
+        assert result.numFrames == 5
+        assert np.allclose(result.positions[:, 0], 0)
+        root = transforms.expandQuaternions([-0.7071067812, 0, 0])
+        expected = transforms.rotateVectors(root, [-190.9219, 66.2344, 106.6172])
+        assert np.allclose(result.positions[:, 1], expected)
+        assert np.allclose(result.orientations[:, 1], transforms.multiplyQuaternions(root, result.localOrientations[:, 1]))
+
+    def test_matrices(self):
+        result = pose.Pose.evaluate(sample())
+        world = result.matrices
+        local = result.localMatrices
+        assert np.allclose(world[:, 2], world[:, 0] @ local[:, 2])
+
+    def test_round_trip(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        offset = transforms.composeMatrices([3, 0, -1], transforms.expandQuaternions([0, 0.2, 0.1]))
+        poses = np.stack([joints.matrices, offset @ joints.matrices, joints.matrices @ offset])
+        anim = pose.animFromMatrices(joints.names, joints.parentIndices, joints.matrices, poses, np.zeros((3, 2, 3)), 24)
+        assert np.allclose(pose.Pose.evaluate(anim).matrices, poses)
+
+    def test_parent_order(self):
+        positions = np.zeros((1, 2, 3))
+        orientations = np.zeros((1, 2, 4))
+        with pytest.raises(ValueError):
+            pose.worldPose(positions, orientations, [1, -1])
@@ -0,0 +1,228 @@
+import dataclasses
+import math
+import numpy as np
+import pytest
+from md5model import arrays
+from md5model import md5mesh
+from md5model import pose
+from md5model import skinning
+from md5model import transforms
+
+
+MD5MESH_SAMPLE = '''MD5Version 10
+commandline "skinning"
+
+numJoints 3
+numMeshes 1
+
+joints {
+\t"origin"\t-1 ( 0 0 0 ) ( 0 0 -0.7071067812 )\t\t// 
+\t"waist"\t0 ( -0.465389 0 51.328655 ) ( -0.5394861067 -0.5394861067 -0.4571156754 )\t\t// origin
+\t"hand"\t1 ( -3.50706 -28.3922 58.702999 ) ( 0.3317336325 0.3162666777 -0.3598525295 )\t\t// waist
+}
+
+mesh {
+\t// meshes: sample
+\tshader "sample"
+
+\tnumverts 4
+\tvert 0 ( 0.5 0.5 ) 0 1
+\tvert 1 ( 0.25 0.5 ) 1 2
+\tvert 2 ( 0.5 0.75 ) 3 3
+\tvert 3 ( 0 1 ) 6 1
+
+\tnumtris 2
+\ttri 0 0 1 2
+\ttri 1 2 1 3
+
+\tnumweights 7
+\tweight 0 0 1 ( 1 2 3 )
+\tweight 1 1 0.75 ( -3.078593 3.522633 -5.625685 )
+\tweight 2 2 0.25 ( -7.45092 1.8983 4.288566 )
+\tweight 3 0 0.5 ( 0.319793 2.069755 -3.67824 )
+\tweight 4 1 0.3 ( 2.455065 5.21452 0.565574 )
+\tweight 5 2 0.2 ( -1.314141 5.837293 0.676343 )
+\tweight 6 2 1 ( 0 0 0 )
+}
+'''
+
+
+def reference_matrix(joint):
+    '''Joint matrix as built by `compute_joint_matrix` in the Blender importer'''
+    (x, y, z) = joint.orientation
+    t = 1.0 - x * x - y * y - z * z
+    w = 0.0 if t < 0.0 else -math.sqrt(t)
+    (w, x, y, z) = (-w, -x, -y, -z)
+    return [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y), joint.position[0]],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x), joint.position[1]],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y), joint.position[2]]]
+
+
+def reference_positions(md5_mesh, mesh):
+    positions = []
+    for vert in mesh.verts:
+        total = [0.0, 0.0, 0.0]
+        for weight in mesh.weights[vert.weightStart:vert.weightEnd]:
+            m = reference_matrix(md5_mesh.joints[weight.jointIndex])
+            p = weight.position
+            for i in range(3):
+                total[i] += (m[i][0] * p[0] + m[i][1] * p[1] + m[i][2] * p[2] + m[i][3]) * weight.bias
+        positions.append(total)
+    return positions
+
+
+class TestBindPose:
+    def test_positions(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        mesh = md5_mesh.meshes[0]
+        positions = skinning.bindPose(transforms.JointTable.from_md5mesh(md5_mesh), mesh)
+        assert positions.shape == (4, 3)
+        assert np.allclose(positions, reference_positions(md5_mesh, mesh))
+
+    def test_arrays(self):
+        md5_mesh = arrays.parseMd5Mesh(MD5MESH_SAMPLE)
+        reference = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        positions = skinning.bindPose(transforms.JointTable.from_md5mesh(md5_mesh), md5_mesh.meshes[0])
+        assert np.allclose(positions, reference_positions(reference, reference.meshes[0]))
+
+    def test_unordered_weights(self):
+        text = MD5MESH_SAMPLE.replace('vert 0 ( 0.5 0.5 ) 0 1', 'vert 0 ( 0.5 0.5 ) 6 1').replace('vert 3 ( 0 1 ) 6 1', 'vert 3 ( 0 1 ) 0 0')
+        md5_mesh = md5mesh.Md5Mesh.parse(text)
+        positions = skinning.bindPose(transforms.JointTable.from_md5mesh(md5_mesh), md5_mesh.meshes[0])
+        assert np.allclose(positions, reference_positions(md5_mesh, md5_mesh.meshes[0]))
+        assert positions[3].tolist() == [0, 0, 0]
+
+
+def reference_groups(mesh):
+    '''Joint -> vert -> summed bias, as the old per-weight `add` loop built them'''
+    groups = {}
+    for vert in mesh.verts:
+        for weight in mesh.weights[vert.weightStart:vert.weightEnd]:
+            group = groups.setdefault(weight.jointIndex, {})
+            group[vert.index] = group.get(vert.index, 0.0) + weight.bias
+    return groups
+
+
+class TestVertexGroups:
+    def expand(self, groups):
+        return {
+            joint: {index: bias for (bias, indices) in entries for index in indices}
+            for (joint, entries) in groups.items()}
+
+    def test_sample(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        for mesh in md5_mesh.meshes:
+            groups = skinning.vertexGroups(mesh)
+            assert list(groups) == sorted(groups)
+            assert self.expand(groups) == reference_groups(mesh)
+
+    def test_shared_bias(self):
+        mesh = md5mesh.Mesh(
+            comment=' shared', shader='',
+            verts=[md5mesh.Vert(index=i, uv=(0, 0), weightStart=i, weightCount=1) for i in range(4)],
+            tris=[],
+            weights=[md5mesh.Weight(index=i, jointIndex=i % 2, bias=1, position=(0, 0, 0)) for i in range(4)])
+        assert skinning.vertexGroups(mesh) == {0: [(1.0, [0, 2])], 1: [(1.0, [1, 3])]}
+
+    def test_repeated_joint(self):
+        mesh = md5mesh.Mesh(
+            comment=' repeated', shader='',
+            verts=[md5mesh.Vert(index=0, uv=(0, 0), weightStart=0, weightCount=2)],
+            tris=[],
+            weights=[md5mesh.Weight(index=i, jointIndex=3, bias=0.25, position=(0, 0, 0)) for i in range(2)])
+        assert skinning.vertexGroups(mesh) == {3: [(0.5, [0])]}
+
+    def test_empty(self):
+        mesh = md5mesh.Mesh(comment=' empty', shader='', verts=[], tris=[], weights=[])
+        assert skinning.vertexGroups(mesh) == {}
+
+
+class TestBindWeights:
+    def test_round_trip(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        mesh = skinning.asMeshArrays(md5_mesh.meshes[0])
+        points = skinning.bindPose(joints, mesh)
+        bias = skinning.sumPerVertex(mesh.bias[skinning.weightOrder(mesh), np.newaxis], mesh.weightCount)
+        order = skinning.weightOrder(mesh)
+        position = skinning.bindWeights(
+            np.linalg.inv(joints.matrices), points / bias, mesh.weightCount, mesh.jointIndex[order])
+        rebuilt = dataclasses.replace(mesh, position=position[np.argsort(order)])
+        assert np.allclose(skinning.bindPose(joints, rebuilt), points)
+
+    def test_empty(self):
+        assert skinning.bindWeights(np.zeros((0, 4, 4)), np.zeros((2, 3)), np.zeros(2, dtype=int), np.zeros(0, dtype=int)).shape == (0, 3)
+
+
+class TestSkinnedBounds:
+    def test_bind_pose(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        mesh = md5_mesh.meshes[0]
+        positions = np.stack([joints.positions, joints.positions + [1, 2, 3]] * 3)
+        orientations = np.stack([joints.orientations] * 6)
+        bounds = skinning.skinnedBounds(mesh, positions, orientations, chunkSize=4)
+        points = skinning.bindPose(joints, mesh)
+        assert bounds.shape == (6, 2, 3)
+        assert np.allclose(bounds[0], [points.min(axis=0), points.max(axis=0)])
+        assert np.allclose(bounds[5], bounds[0] + [1, 2, 3])
+
+    def test_weights(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        mesh = skinning.asMeshArrays(md5_mesh.meshes[0])
+        weights = skinning.SkinWeights(mesh.weightStart, mesh.weightCount, mesh.jointIndex, mesh.bias, mesh.position)
+        positions = np.stack([joints.positions, joints.positions + [1, 2, 3]])
+        orientations = np.stack([joints.orientations] * 2)
+        assert np.allclose(
+            skinning.skinnedBounds(weights, positions, orientations),
+            skinning.skinnedBounds(mesh, positions, orientations))
+
+    def test_bound_weights(self):
+        # Bounds of four points bound to the joints with `bind`, without a mesh
+        joints = transforms.JointTable.from_md5mesh(md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE))
+        points = np.array([[0, 0, 0], [2, 0, 0], [2, 3, 0], [0, 3, 1]], dtype=np.float64)
+        weights = skinning.SkinWeights.bind(
+            np.linalg.inv(joints.matrices), points, [1, 1, 2, 1], [0, 1, 1, 2, 2], [1, 1, 0.5, 0.5, 1])
+        assert weights.numVerts == 4
+        assert weights.weightStart.tolist() == [0, 1, 2, 4]
+        bounds = skinning.skinnedBounds(weights, joints.positions[np.newaxis], joints.orientations[np.newaxis])
+        assert np.allclose(bounds[0], [[0, 0, 0], [2, 3, 1]])
+
+
+class TestSkinAnimation:
+    OFFSET = transforms.composeMatrices([3, 0, -1], transforms.expandQuaternions([0, 0.2, 0.1]))
+
+    def clip(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh)
+        poses = np.stack([joints.matrices, self.OFFSET @ joints.matrices] * 3)
+        anim = pose.animFromMatrices(joints.names, joints.parentIndices, joints.matrices, poses, np.zeros((6, 2, 3)), 24, 'test')
+        return (md5_mesh, joints, anim)
+
+    def test_frames(self):
+        (md5_mesh, joints, anim) = self.clip()
+        (skinned,) = skinning.skinAnimation(md5_mesh, anim)
+        points = skinning.bindPose(joints, md5_mesh.meshes[0])
+        assert skinned.shape == (6,) + points.shape
+        assert np.allclose(skinned[0], points)
+        assert np.allclose(skinned[1], transforms.transformPoints(self.OFFSET, points))
+
+    def test_range(self):
+        (md5_mesh, joints, anim) = self.clip()
+        (skinned,) = skinning.skinAnimation(md5_mesh, anim.to_md5anim(), 3, 5)
+        assert np.allclose(skinned, skinning.skinAnimation(md5_mesh, anim)[0][3:5])
+
+    def test_stream(self):
+        (md5_mesh, joints, anim) = self.clip()
+        (skinned,) = skinning.skinAnimation(md5_mesh, anim)
+        frames = [x for (x,) in skinning.iterSkinnedFrames(md5_mesh, anim, 1, chunkSize=2)]
+        assert len(frames) == 5
+        assert np.allclose(np.stack(frames), skinned[1:])
+
+    def test_missing_joint(self):
+        (md5_mesh, joints, anim) = self.clip()
+        anim = dataclasses.replace(anim, hierarchies=[dataclasses.replace(x, jointName='other') for x in anim.hierarchies])
+        with pytest.raises(ValueError):
+            skinning.skinAnimation(md5_mesh, anim)
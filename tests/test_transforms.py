@@ -0,0 +1,106 @@
+import numpy as np
+from md5model import md5mesh
+from md5model import transforms
+from . import test_skinning
+
+
+ORIENTATIONS = [
+    (0, 0, -0.7071067812),
+    (-0.5394861067, -0.5394861067, -0.4571156754),
+    (0.3317336325, 0.3162666777, -0.3598525295),
+    (0.9, 0.5, 0.1)]
+
+
+class TestQuaternions:
+    def test_expand(self):
+        q = transforms.expandQuaternions([[0, 0, -0.6], [1, 1, 0]])
+        assert q.tolist() == [[-0.8, 0, 0, -0.6], [0, 1, 1, 0]]
+
+    def test_rotate(self):
+        q = transforms.expandQuaternions([0, 0, -0.7071067812])
+        assert np.allclose(transforms.rotateVectors(q, [1, 0, 0]), [0, 1, 0])
+
+    def test_matrices(self):
+        q = transforms.expandQuaternions(ORIENTATIONS)
+        m = transforms.quaternionsToMatrices(q)
+        v = np.array([1.5, -2.0, 0.25])
+        assert np.allclose(m @ v, transforms.rotateVectors(q, v))
+
+    def test_multiply(self):
+        (a, b) = transforms.expandQuaternions(ORIENTATIONS[1:3])
+        v = np.array([1.5, -2.0, 0.25])
+        ab = transforms.multiplyQuaternions(a, b)
+        assert np.allclose(transforms.rotateVectors(ab, v), transforms.rotateVectors(a, transforms.rotateVectors(b, v)))
+
+    def test_conjugate(self):
+        q = transforms.expandQuaternions(ORIENTATIONS[:3])
+        assert np.allclose(transforms.multiplyQuaternions(q, transforms.conjugateQuaternions(q)), [1, 0, 0, 0])
+
+    def test_from_matrices(self):
+        q = transforms.expandQuaternions(ORIENTATIONS[:3])
+        result = transforms.matricesToQuaternions(transforms.quaternionsToMatrices(q))
+        assert np.allclose(result, -q)
+        assert (result[:, 0] >= 0).all()
+
+    def test_from_matrices_scaled(self):
+        q = transforms.normalizeQuaternions(np.array([[0.1, 0.9, -0.3, 0.2], [0.0, 0.0, 1.0, 0.0], [0.0, 0.6, 0.0, 0.8]]))
+        m = transforms.quaternionsToMatrices(q) * 3.0
+        assert np.allclose(transforms.matricesToQuaternions(m), q)
+
+
+class TestMatrices:
+    def test_compose(self):
+        m = transforms.composeMatrices([1, 2, 3], transforms.expandQuaternions([0, 0, -0.7071067812]))
+        assert np.allclose(transforms.transformPoints(m, [1, 0, 0]), [1, 3, 3])
+        assert m[3].tolist() == [0, 0, 0, 1]
+
+
+class TestJointTable:
+    def test_table(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        table = transforms.JointTable.from_md5mesh(md5_mesh)
+        assert len(table) == 3
+        assert table.names == ['origin', 'waist', 'hand']
+        assert table.parentIndices.tolist() == [-1, 0, 1]
+        for (joint, matrix) in zip(md5_mesh.joints, table.matrices):
+            assert np.allclose(matrix[:3], test_skinning.reference_matrix(joint))
+
+    def test_indices(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        table = transforms.JointTable.from_md5mesh(md5_mesh)
+        assert table.indices == {'origin': 0, 'waist': 1, 'hand': 2}
+
+    def test_from_matrices(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        table = transforms.JointTable.from_md5mesh(md5_mesh)
+        result = transforms.JointTable.from_matrices(table.names, table.parentIndices.tolist(), table.matrices)
+        assert np.allclose(result.positions, table.positions)
+        assert np.allclose(result.orientations, table.orientations)
+
+    def test_to_joints(self):
+        md5_mesh = md5mesh.Md5Mesh.parse(test_skinning.MD5MESH_SAMPLE)
+        joints = transforms.JointTable.from_md5mesh(md5_mesh).to_joints()
+        assert [x.name for x in joints] == [x.name for x in md5_mesh.joints]
+        assert [x.parentIndex for x in joints] == [x.parentIndex for x in md5_mesh.joints]
+        assert [x.comment for x in joints] == [' ', ' origin', ' waist']
+        for (joint, expected) in zip(joints, md5_mesh.joints):
+            assert np.allclose(joint.position, expected.position)
+            assert np.allclose(joint.orientation, expected.orientation)
+
+
+class TestSlerp:
+    def test_halfway(self):
+        a = np.array([1.0, 0, 0, 0])
+        b = np.array([np.cos(np.pi / 4), 0, 0, np.sin(np.pi / 4)])
+        result = transforms.slerpQuaternions(a, b, 0.5)
+        assert np.allclose(result, [np.cos(np.pi / 8), 0, 0, np.sin(np.pi / 8)])
+
+    def test_shorter_arc(self):
+        a = np.array([1.0, 0, 0, 0])
+        result = transforms.slerpQuaternions(a, -a, [0.0, 0.5, 1.0])
+        assert np.allclose(np.abs(result[..., 0]), 1)
+
+    def test_ends(self):
+        q = transforms.normalizeQuaternions(transforms.expandQuaternions(ORIENTATIONS[:3]))
+        assert np.allclose(transforms.slerpQuaternions(q[0], q[1], 0.0), q[0])
+        assert np.allclose(np.abs(np.sum(transforms.slerpQuaternions(q[0], q[1], 1.0) * q[1])), 1)